@@ -49,6 +49,14 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
+# Size the connection pool for concurrent requests and scheduler jobs.
+# In-memory SQLite uses a single-connection pool that takes no sizing options.
+if app.config["SQLALCHEMY_DATABASE_URI"] not in ("sqlite://", "sqlite:///:memory:"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"].update({
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+    })
+
 # Initialize the app with the extension
 db.init_app(app)
 
@@ -87,8 +95,9 @@ with app.app_context():
     # Import models
     import models  # noqa: F401
 
-    # Create all tables
+    # Create all tables and add any columns/indexes missing from existing ones
     db.create_all()
+    models.upgrade_schema()
 
     # Register blueprints/routes
     from routes.goal_routes import goals_bp
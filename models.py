@@ -1,7 +1,11 @@
+import logging
 from datetime import datetime, time
 from app import db
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.hybrid import hybrid_property
 
+logger = logging.getLogger(__name__)
+
 
 class Category(db.Model):
     """Model for goal categories like study, freelancing, etc."""
@@ -95,6 +99,15 @@ class Task(db.Model):
     # Relationship with reminders
     reminders = db.relationship('Reminder', backref='task', lazy='dynamic', cascade="all, delete-orphan")
     
+    # Back the incomplete-task lookups by deadline and by priority, and the
+    # completion-date range scans used for streaks and daily metrics
+    __table_args__ = (
+        db.Index('ix_task_completed_deadline', 'completed', 'deadline'),
+        db.Index('ix_task_completed_priority', 'completed', 'priority'),
+        db.Index('ix_task_completed_recurrence', 'completed', 'recurrence_type'),
+        db.Index('ix_task_completion_date', 'completion_date'),
+    )
+    
     @hybrid_property
     def is_overdue(self):
         """Check if the task is overdue"""
@@ -191,6 +204,16 @@ class TimeSlot(db.Model):
     goal_id = db.Column(db.Integer, db.ForeignKey('goal.id'), nullable=True)
     goal = db.relationship('Goal', backref='time_slots')
     
+    # Task this slot was scheduled for, if it was auto-scheduled
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id', ondelete='SET NULL'), nullable=True, index=True)
+    
+    @staticmethod
+    def seconds_between(start_time, end_time):
+        """Whole seconds from start_time to end_time, wrapping past midnight"""
+        start = ((start_time.hour * 60 + start_time.minute) * 60 + start_time.second) * 1000000 + start_time.microsecond
+        end = ((end_time.hour * 60 + end_time.minute) * 60 + end_time.second) * 1000000 + end_time.microsecond
+        return (end - start) % 86400000000 // 1000000
+    
     def __repr__(self):
         return f"<TimeSlot {self.title} ({self.start_time}-{self.end_time})>"
     
@@ -204,6 +227,7 @@ class TimeSlot(db.Model):
             'start_time': self.start_time.isoformat() if self.start_time else None,
             'end_time': self.end_time.isoformat() if self.end_time else None,
             'goal_id': self.goal_id,
+            'task_id': self.task_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -215,6 +239,11 @@ class AIMessage(db.Model):
     message = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     response_to = db.Column(db.Integer, nullable=True)  # ID of the message this is responding to
+    kind = db.Column(db.String(32), nullable=True)  # Proactive message type, e.g. evening_summary
+    
+    __table_args__ = (
+        db.Index('ix_aimessage_kind_timestamp', 'kind', 'timestamp'),
+    )
     
     def __repr__(self):
         return f"<{'User' if self.is_from_user else 'AI'} Message: {self.message[:20]}...>"
@@ -225,7 +254,8 @@ class AIMessage(db.Model):
             'is_from_user': self.is_from_user,
             'message': self.message,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
-            'response_to': self.response_to
+            'response_to': self.response_to,
+            'kind': self.kind
         }
 
 
@@ -252,3 +282,68 @@ class UserPreference(db.Model):
             'do_not_disturb': self.do_not_disturb,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+def _references_clause(column):
+    """REFERENCES clause for a column's (single) foreign key"""
+    foreign_key = next(iter(column.foreign_keys))
+    clause = f'REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})'
+    if foreign_key.ondelete:
+        clause += f' ON DELETE {foreign_key.ondelete}'
+    return clause
+
+
+def upgrade_schema():
+    """
+    Bring an existing database up to date with the models
+    
+    db.create_all() only creates missing tables, so columns and indexes
+    added to existing models are created here. New columns are added as
+    nullable, together with their foreign keys; anything that cannot be
+    added that way is logged.
+    
+    A column that already exists without its foreign key (added by an
+    older version of this function) gets the constraint added on
+    databases that support ALTER TABLE ... ADD FOREIGN KEY. SQLite does
+    not, so there the constraint is missing until the table is rebuilt;
+    the application clears such links itself before deleting rows.
+    """
+    inspector = inspect(db.engine)
+    can_alter_constraints = db.engine.dialect.name != 'sqlite'
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        existing_foreign_keys = {
+            tuple(foreign_key['constrained_columns'])
+            for foreign_key in inspector.get_foreign_keys(table.name)
+        }
+        
+        for column in table.columns:
+            if column.name in existing_columns:
+                if (can_alter_constraints and column.foreign_keys
+                        and (column.name,) not in existing_foreign_keys):
+                    with db.engine.begin() as connection:
+                        connection.execute(text(
+                            f'ALTER TABLE {table.name} ADD FOREIGN KEY ({column.name}) '
+                            f'{_references_clause(column)}'
+                        ))
+                    logger.info(f"Added foreign key on {table.name}.{column.name}")
+                continue
+            
+            if not column.nullable or column.primary_key:
+                logger.warning(f"Cannot add non-nullable column {table.name}.{column.name} automatically")
+                continue
+            
+            column_ddl = f'{column.name} {column.type.compile(dialect=db.engine.dialect)}'
+            if column.foreign_keys:
+                column_ddl += f' {_references_clause(column)}'
+            
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column_ddl}'))
+            logger.info(f"Added column {table.name}.{column.name}")
+        
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
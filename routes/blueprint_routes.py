@@ -17,7 +17,13 @@ blueprint_bp = Blueprint('blueprints', __name__, url_prefix='/api/blueprints')
 def list_blueprints():
     """Get all blueprints"""
     active_only = request.args.get('active_only', 'false').lower() == 'true'
-    blueprints = get_all_blueprints(active_only)
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', type=int)
+    
+    try:
+        blueprints = get_all_blueprints(active_only, limit=limit, offset=offset)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     return jsonify({
         'blueprints': [blueprint.to_dict() for blueprint in blueprints]
@@ -14,7 +14,14 @@ categories_bp = Blueprint('categories', __name__, url_prefix='/api/categories')
 @categories_bp.route('/', methods=['GET'])
 def list_categories():
     """Get all categories"""
-    categories = get_all_categories()
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', type=int)
+    
+    try:
+        categories = get_all_categories(limit=limit, offset=offset)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     return jsonify([category.to_dict() for category in categories])
 
 @categories_bp.route('/<int:category_id>', methods=['GET'])
@@ -16,8 +16,15 @@ def list_goals():
     """Get all goals"""
     category_id = request.args.get('category_id', type=int)
     completed = request.args.get('completed', type=lambda v: v.lower() == 'true')
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', type=int)
+    
+    try:
+        goals = get_all_goals(category_id=category_id, completed=completed,
+                              limit=limit, offset=offset)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    goals = get_all_goals(category_id=category_id, completed=completed)
     return jsonify([goal.to_dict() for goal in goals])
 
 @goals_bp.route('/<int:goal_id>', methods=['GET'])
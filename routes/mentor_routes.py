@@ -1,6 +1,7 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from services.mentor_ai_service import (
     get_user_response,
+    stream_user_response,
     generate_proactive_message, 
     should_send_proactive_message,
     record_feedback,
@@ -36,6 +37,22 @@ def chat_with_mentor():
             "response": response
         })
 
+@mentor_bp.route('/chat/stream', methods=['POST'])
+def stream_chat_with_mentor():
+    """Send a message to the AI mentor and stream the response as plain text"""
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    
+    data = request.get_json()
+    
+    if 'message' not in data or not data['message'].strip():
+        return jsonify({"error": "Message cannot be empty"}), 400
+    
+    return Response(
+        stream_with_context(stream_user_response(data['message'])),
+        mimetype='text/plain'
+    )
+
 @mentor_bp.route('/proactive/<message_type>', methods=['GET'])
 def get_proactive_message(message_type):
     """Get a proactive message from the AI mentor"""
@@ -8,6 +8,9 @@ import os
 from datetime import datetime, timedelta
 from app import db
 from models import Category, Goal, Task, Blueprint, TimeSlot
+from services.blueprint_service import invalidate_schedule_cache
+from services.progress_service import invalidate_progress_cache
+from utils.priority_engine import invalidate_priority_cache
 
 logger = logging.getLogger(__name__)
 
@@ -233,6 +236,9 @@ def import_blueprint_to_database(blueprint_data):
         
         # Commit all changes
         db.session.commit()
+        invalidate_progress_cache()
+        invalidate_priority_cache()
+        invalidate_schedule_cache()
         logger.info("Successfully imported blueprint to database")
         return True
     
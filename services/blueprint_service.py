@@ -2,10 +2,15 @@
 Blueprint service for the Mentora application
 Handles business logic for schedule blueprint management
 """
+import copy
 import logging
+import threading
 from datetime import datetime, time
+from time import monotonic
 import re
 
+from sqlalchemy import exists, select
+
 from app import db
 from models import Blueprint, TimeSlot, Category, Goal
 
@@ -14,22 +19,62 @@ logger = logging.getLogger(__name__)
 # Regular expression for time in HH:MM format
 TIME_REGEX = re.compile(r'^([01]?[0-9]|2[0-3]):([0-5][0-9])$')
 
-def get_all_blueprints(active_only=False):
+# How long a built today-schedule payload is reused (in seconds)
+TODAY_SCHEDULE_TTL = 300
+
+# Process-local cache for get_today_schedule: {(date, version): (expires_at, payload)}
+_today_schedule_cache = {}
+_today_schedule_lock = threading.Lock()
+_schedule_version = 0
+
+def invalidate_schedule_cache():
+    """
+    Invalidate cached today-schedule payloads
+    
+    Must be called whenever blueprints, time slots, categories or goals
+    change, since the payload includes category and goal details.
+    """
+    global _schedule_version
+    
+    with _today_schedule_lock:
+        _schedule_version += 1
+        _today_schedule_cache.clear()
+
+def get_all_blueprints(active_only=False, limit=None, offset=None):
     """
     Get all schedule blueprints
     
     Args:
         active_only: Only return active blueprints
+        limit: Maximum number of blueprints to return (optional)
+        offset: Number of blueprints to skip (optional)
     
     Returns:
         List of Blueprint objects
+    
+    Raises:
+        ValueError: If limit or offset is negative
     """
+    if limit is not None and limit < 0:
+        raise ValueError("Limit must not be negative")
+    
+    if offset is not None and offset < 0:
+        raise ValueError("Offset must not be negative")
+    
     query = Blueprint.query
     
     if active_only:
         query = query.filter_by(is_active=True)
     
-    return query.order_by(Blueprint.name).all()
+    query = query.order_by(Blueprint.name, Blueprint.id)
+    
+    if limit is not None:
+        query = query.limit(limit)
+    
+    if offset is not None:
+        query = query.offset(offset)
+    
+    return query.all()
 
 def get_blueprint_by_id(blueprint_id):
     """
@@ -91,8 +136,9 @@ def create_blueprint(name, description=None, day_of_week=None, is_active=True):
     
     db.session.add(blueprint)
     db.session.commit()
+    invalidate_schedule_cache()
     
-    logger.info(f"Created new blueprint: {blueprint.id}")
+    logger.info("Created new blueprint: %s", blueprint.id)
     return blueprint
 
 def update_blueprint(blueprint_id, name=None, description=None, day_of_week=None, is_active=None):
@@ -129,8 +175,9 @@ def update_blueprint(blueprint_id, name=None, description=None, day_of_week=None
     blueprint.updated_at = datetime.utcnow()
     
     db.session.commit()
+    invalidate_schedule_cache()
     
-    logger.info(f"Updated blueprint: {blueprint.id}")
+    logger.info("Updated blueprint: %s", blueprint.id)
     return blueprint
 
 def delete_blueprint(blueprint_id):
@@ -150,8 +197,9 @@ def delete_blueprint(blueprint_id):
     
     db.session.delete(blueprint)
     db.session.commit()
+    invalidate_schedule_cache()
     
-    logger.info(f"Deleted blueprint: {blueprint_id}")
+    logger.info("Deleted blueprint: %s", blueprint_id)
     return True
 
 def get_time_slots(blueprint_id=None, category_id=None):
@@ -197,6 +245,39 @@ def _parse_time(time_str):
     
     return time(hour, minute)
 
+def _check_references(blueprint_id=None, category_id=None, goal_id=None):
+    """
+    Check that the referenced blueprint, category and goal exist
+    
+    All provided IDs are checked in a single round-trip using one EXISTS
+    subquery per entity.
+    
+    Args:
+        blueprint_id: Blueprint ID to check (optional)
+        category_id: Category ID to check (optional)
+        goal_id: Goal ID to check (optional)
+        
+    Raises:
+        ValueError: If any of the referenced records does not exist
+    """
+    checks = [
+        ('Blueprint', Blueprint, blueprint_id),
+        ('Category', Category, category_id),
+        ('Goal', Goal, goal_id)
+    ]
+    checks = [(label, model, record_id) for label, model, record_id in checks if record_id is not None]
+    
+    if not checks:
+        return
+    
+    row = db.session.execute(
+        select(*[exists().where(model.id == record_id) for _, model, record_id in checks])
+    ).one()
+    
+    for (label, _, record_id), found in zip(checks, row):
+        if not found:
+            raise ValueError(f"{label} with ID {record_id} not found")
+
 def create_time_slot(blueprint_id, category_id, title, start_time, end_time, description=None, goal_id=None):
     """
     Create a new time slot
@@ -213,21 +294,12 @@ def create_time_slot(blueprint_id, category_id, title, start_time, end_time, des
     Returns:
         Newly created TimeSlot object
     """
-    # Check if blueprint exists
-    blueprint = Blueprint.query.get(blueprint_id)
-    if not blueprint:
-        raise ValueError(f"Blueprint with ID {blueprint_id} not found")
-    
-    # Check if category exists
-    category = Category.query.get(category_id)
-    if not category:
-        raise ValueError(f"Category with ID {category_id} not found")
-    
-    # Check if goal exists (if provided)
-    if goal_id:
-        goal = Goal.query.get(goal_id)
-        if not goal:
-            raise ValueError(f"Goal with ID {goal_id} not found")
+    # Check that blueprint, category and goal (if provided) exist
+    _check_references(
+        blueprint_id=blueprint_id,
+        category_id=category_id,
+        goal_id=goal_id or None
+    )
     
     # Parse times
     start_time_obj = _parse_time(start_time)
@@ -256,8 +328,9 @@ def create_time_slot(blueprint_id, category_id, title, start_time, end_time, des
     
     db.session.add(time_slot)
     db.session.commit()
+    invalidate_schedule_cache()
     
-    logger.info(f"Created new time slot: {time_slot.id}")
+    logger.info("Created new time slot: %s", time_slot.id)
     return time_slot
 
 def update_time_slot(slot_id, title=None, description=None, start_time=None, end_time=None, 
@@ -306,11 +379,14 @@ def update_time_slot(slot_id, title=None, description=None, start_time=None, end
     if time_slot.start_time >= time_slot.end_time:
         raise ValueError("End time must be after start time")
     
+    # Check that the new category and goal (if provided) exist
+    _check_references(
+        category_id=category_id,
+        goal_id=goal_id or None  # goal_id 0 removes the association
+    )
+    
     # Update category if provided
     if category_id is not None:
-        category = Category.query.get(category_id)
-        if not category:
-            raise ValueError(f"Category with ID {category_id} not found")
         time_slot.category_id = category_id
     
     # Update goal if provided
@@ -318,14 +394,12 @@ def update_time_slot(slot_id, title=None, description=None, start_time=None, end
         if goal_id == 0:  # Allow removing goal association
             time_slot.goal_id = None
         else:
-            goal = Goal.query.get(goal_id)
-            if not goal:
-                raise ValueError(f"Goal with ID {goal_id} not found")
             time_slot.goal_id = goal_id
     
     db.session.commit()
+    invalidate_schedule_cache()
     
-    logger.info(f"Updated time slot: {time_slot.id}")
+    logger.info("Updated time slot: %s", time_slot.id)
     return time_slot
 
 def delete_time_slot(slot_id):
@@ -345,18 +419,62 @@ def delete_time_slot(slot_id):
     
     db.session.delete(time_slot)
     db.session.commit()
+    invalidate_schedule_cache()
     
-    logger.info(f"Deleted time slot: {slot_id}")
+    logger.info("Deleted time slot: %s", slot_id)
     return True
 
-def get_today_schedule():
+def get_today_schedule(shared=False):
     """
     Get the schedule for today
     
+    The payload is cached per day for TODAY_SCHEDULE_TTL seconds and
+    invalidated whenever blueprints, time slots, categories or goals change.
+    
+    Args:
+        shared: Return the cached payload itself instead of a copy; callers
+            passing True must not modify it
+    
     Returns:
         Dictionary with schedule details for today
     """
+    # Imported here because schedule_engine imports this module
+    from services.schedule_engine import regenerate_if_dirty
+    
+    # Apply any deferred regeneration before reading, as get_daily_schedule does
+    regenerate_if_dirty()
+    
     today = datetime.utcnow()
+    now_ts = monotonic()
+    
+    with _today_schedule_lock:
+        cache_key = (today.date(), _schedule_version)
+        cached = _today_schedule_cache.get(cache_key)
+    
+    if cached and cached[0] > now_ts:
+        schedule = cached[1]
+    else:
+        schedule = _build_today_schedule(today)
+        
+        with _today_schedule_lock:
+            # Only store if no invalidation happened while the payload was being built
+            if cache_key[1] == _schedule_version:
+                _today_schedule_cache.clear()
+                _today_schedule_cache[cache_key] = (now_ts + TODAY_SCHEDULE_TTL, schedule)
+    
+    # Hand out a copy so callers cannot corrupt the cached payload
+    return schedule if shared else copy.deepcopy(schedule)
+
+def _build_today_schedule(today):
+    """
+    Build the schedule payload for the given day
+    
+    Args:
+        today: datetime for the day to build the schedule for
+    
+    Returns:
+        Dictionary with schedule details for the day
+    """
     day_of_week = today.strftime('%A')  # Monday, Tuesday, etc.
     
     # Get blueprint for today
@@ -373,26 +491,26 @@ def get_today_schedule():
             'time_slots': []
         }
     
-    # Get time slots for this blueprint
-    time_slots = get_time_slots(blueprint_id=blueprint.id)
+    # Get time slots for this blueprint with their category and goal in one query
+    rows = db.session.query(TimeSlot, Category, Goal).outerjoin(
+        Category, Category.id == TimeSlot.category_id
+    ).outerjoin(
+        Goal, Goal.id == TimeSlot.goal_id
+    ).filter(
+        TimeSlot.blueprint_id == blueprint.id
+    ).order_by(TimeSlot.start_time).all()
     
     # Format time slots
     formatted_slots = []
-    for slot in time_slots:
-        # Get category details
-        category = Category.query.get(slot.category_id)
-        
-        # Get goal details if associated
-        goal = None
-        if slot.goal_id:
-            goal = Goal.query.get(slot.goal_id)
-        
+    for slot, category, goal in rows:
         formatted_slots.append({
             'id': slot.id,
             'title': slot.title,
             'description': slot.description,
             'start_time': slot.start_time.strftime('%H:%M'),
             'end_time': slot.end_time.strftime('%H:%M'),
+            'start_minute': slot.start_time.hour * 60 + slot.start_time.minute,
+            'end_minute': slot.end_time.hour * 60 + slot.end_time.minute,
             'category_id': slot.category_id,
             'category_name': category.name if category else None,
             'category_color': category.color if category else None,
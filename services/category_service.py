@@ -3,20 +3,48 @@ Category service for the Mentora application
 Handles business logic for category management
 """
 import logging
+from sqlalchemy import select
 from app import db
-from models import Category
+from models import Category, Goal, Task, TimeSlot
 from config import DEFAULT_CATEGORIES
+from services.blueprint_service import invalidate_schedule_cache
+from services.progress_service import invalidate_progress_cache
+from utils.priority_engine import invalidate_priority_cache
 
 logger = logging.getLogger(__name__)
 
-def get_all_categories():
+def get_all_categories(limit=None, offset=None):
     """
     Get all categories
     
+    Args:
+        limit: Maximum number of categories to return (optional)
+        offset: Number of categories to skip (optional)
+    
     Returns:
         List of Category objects
+    
+    Raises:
+        ValueError: If limit or offset is negative
     """
-    return Category.query.all()
+    if limit is not None and limit < 0:
+        raise ValueError("Limit must not be negative")
+    
+    if offset is not None and offset < 0:
+        raise ValueError("Offset must not be negative")
+    
+    query = Category.query
+    
+    if limit is not None or offset is not None:
+        query = query.order_by(Category.id)
+    
+    if limit is not None:
+        query = query.limit(limit)
+    
+    if offset is not None:
+        query = query.offset(offset)
+    
+    return query.all()
 
 def get_category_by_id(category_id):
     """
@@ -57,7 +85,7 @@ def create_category(name, description=None, color=None):
     # Check if category with this name already exists
     existing = get_category_by_name(name)
     if existing:
-        logger.warning(f"Category with name '{name}' already exists")
+        logger.warning("Category with name '%s' already exists", name)
         return existing
     
     category = Category(
@@ -69,7 +97,7 @@ def create_category(name, description=None, color=None):
     db.session.add(category)
     db.session.commit()
     
-    logger.info(f"Created new category: {category.id} - {category.name}")
+    logger.info("Created new category: %s - %s", category.id, category.name)
     return category
 
 def update_category(category_id, name=None, description=None, color=None):
@@ -88,7 +116,7 @@ def update_category(category_id, name=None, description=None, color=None):
     category = Category.query.get(category_id)
     
     if not category:
-        logger.warning(f"Attempted to update non-existent category with ID: {category_id}")
+        logger.warning("Attempted to update non-existent category with ID: %s", category_id)
         return None
     
     # Update fields if provided
@@ -96,7 +124,7 @@ def update_category(category_id, name=None, description=None, color=None):
         # Check if another category already has this name
         existing = get_category_by_name(name)
         if existing and existing.id != category_id:
-            logger.warning(f"Another category with name '{name}' already exists")
+            logger.warning("Another category with name '%s' already exists", name)
         else:
             category.name = name
     
@@ -108,8 +136,9 @@ def update_category(category_id, name=None, description=None, color=None):
     
     db.session.add(category)
     db.session.commit()
+    invalidate_schedule_cache()
     
-    logger.info(f"Updated category: {category.id}")
+    logger.info("Updated category: %s", category.id)
     return category
 
 def delete_category(category_id):
@@ -125,14 +154,24 @@ def delete_category(category_id):
     category = Category.query.get(category_id)
     
     if not category:
-        logger.warning(f"Attempted to delete non-existent category with ID: {category_id}")
+        logger.warning("Attempted to delete non-existent category with ID: %s", category_id)
         return False
     
+    # Unlink time slots scheduled for the category's tasks; SQLite does not
+    # enforce the foreign key's ON DELETE action
+    goal_ids = select(Goal.id).where(Goal.category_id == category_id)
+    TimeSlot.query.filter(
+        TimeSlot.task_id.in_(select(Task.id).where(Task.goal_id.in_(goal_ids)))
+    ).update({TimeSlot.task_id: None}, synchronize_session=False)
+    
     # Category deletion will cascade to goals and tasks due to relationship setup
     db.session.delete(category)
     db.session.commit()
+    invalidate_progress_cache()
+    invalidate_priority_cache()
+    invalidate_schedule_cache()
     
-    logger.info(f"Deleted category: {category_id}")
+    logger.info("Deleted category: %s", category_id)
     return True
 
 def get_default_categories():
@@ -165,5 +204,5 @@ def get_default_categories():
             )
             result.append(category)
     
-    logger.info(f"Created/updated {len(result)} default categories")
+    logger.info("Created/updated %s default categories", len(result))
     return result
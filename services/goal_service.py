@@ -1,25 +1,43 @@
 """
 Goal service for the Mentora application
 Handles business logic for goal management
+
+ISO date strings (including a trailing 'Z') are parsed with
+datetime.fromisoformat, which requires Python 3.11+.
 """
 import logging
 from datetime import datetime
+from sqlalchemy import func, case, or_, select
 from app import db
-from models import Goal, Task
+from models import Goal, Task, TimeSlot
+from services.blueprint_service import invalidate_schedule_cache
+from services.progress_service import invalidate_progress_cache
+from utils.priority_engine import invalidate_priority_cache
 
 logger = logging.getLogger(__name__)
 
-def get_all_goals(category_id=None, completed=None):
+def get_all_goals(category_id=None, completed=None, limit=None, offset=None):
     """
     Get all goals with optional filtering
     
     Args:
         category_id: Filter by category ID
         completed: Filter by completion status
+        limit: Maximum number of goals to return (optional)
+        offset: Number of goals to skip (optional)
     
     Returns:
         List of Goal objects
+    
+    Raises:
+        ValueError: If limit or offset is negative
     """
+    if limit is not None and limit < 0:
+        raise ValueError("Limit must not be negative")
+    
+    if offset is not None and offset < 0:
+        raise ValueError("Offset must not be negative")
+    
     query = Goal.query
     
     if category_id is not None:
@@ -28,6 +46,15 @@ def get_all_goals(category_id=None, completed=None):
     if completed is not None:
         query = query.filter_by(completed=completed)
     
+    if limit is not None or offset is not None:
+        query = query.order_by(Goal.id)
+    
+    if limit is not None:
+        query = query.limit(limit)
+    
+    if offset is not None:
+        query = query.offset(offset)
+    
     return query.all()
 
 def get_goal_by_id(goal_id):
@@ -59,10 +86,10 @@ def create_goal(title, category_id, description=None, start_date=None, end_date=
     """
     # Convert string dates to datetime objects if necessary
     if isinstance(start_date, str):
-        start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+        start_date = datetime.fromisoformat(start_date)
     
     if isinstance(end_date, str):
-        end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        end_date = datetime.fromisoformat(end_date)
     
     goal = Goal(
         title=title,
@@ -75,8 +102,10 @@ def create_goal(title, category_id, description=None, start_date=None, end_date=
     
     db.session.add(goal)
     db.session.commit()
+    invalidate_progress_cache()
+    invalidate_priority_cache()
     
-    logger.info(f"Created new goal: {goal.id} - {goal.title}")
+    logger.info("Created new goal: %s - %s", goal.id, goal.title)
     return goal
 
 def update_goal(goal_id, title=None, description=None, category_id=None, 
@@ -99,7 +128,7 @@ def update_goal(goal_id, title=None, description=None, category_id=None,
     goal = Goal.query.get(goal_id)
     
     if not goal:
-        logger.warning(f"Attempted to update non-existent goal with ID: {goal_id}")
+        logger.warning("Attempted to update non-existent goal with ID: %s", goal_id)
         return None
     
     # Update fields if provided
@@ -114,29 +143,34 @@ def update_goal(goal_id, title=None, description=None, category_id=None,
     
     if start_date is not None:
         if isinstance(start_date, str):
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+            start_date = datetime.fromisoformat(start_date)
         goal.start_date = start_date
     
     if end_date is not None:
         if isinstance(end_date, str):
-            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            end_date = datetime.fromisoformat(end_date)
         goal.end_date = end_date
     
-    if completed is not None:
+    if completed is not None and completed != goal.completed:
         goal.completed = completed
         
-        # If marking as completed, check if all tasks are completed
-        if completed and goal.tasks.count() > 0:
-            incomplete_tasks = goal.tasks.filter_by(completed=False).count()
-            if incomplete_tasks > 0:
-                logger.info(f"Marking goal {goal_id} as complete with {incomplete_tasks} incomplete tasks")
+        # If marking as completed, check whether any task is still incomplete
+        if completed:
+            has_incomplete = db.session.query(
+                Task.query.filter_by(goal_id=goal.id, completed=False).exists()
+            ).scalar()
+            if has_incomplete:
+                logger.info("Marking goal %s as complete with incomplete tasks", goal_id)
     
     goal.updated_at = datetime.utcnow()
     
     db.session.add(goal)
     db.session.commit()
+    invalidate_progress_cache()
+    invalidate_priority_cache()
+    invalidate_schedule_cache()
     
-    logger.info(f"Updated goal: {goal.id}")
+    logger.info("Updated goal: %s", goal.id)
     return goal
 
 def delete_goal(goal_id):
@@ -152,14 +186,23 @@ def delete_goal(goal_id):
     goal = Goal.query.get(goal_id)
     
     if not goal:
-        logger.warning(f"Attempted to delete non-existent goal with ID: {goal_id}")
+        logger.warning("Attempted to delete non-existent goal with ID: %s", goal_id)
         return False
     
+    # Unlink time slots scheduled for the goal's tasks; SQLite does not
+    # enforce the foreign key's ON DELETE action
+    TimeSlot.query.filter(
+        TimeSlot.task_id.in_(select(Task.id).where(Task.goal_id == goal_id))
+    ).update({TimeSlot.task_id: None}, synchronize_session=False)
+    
     # Goal deletion will cascade to tasks due to relationship setup
     db.session.delete(goal)
     db.session.commit()
+    invalidate_progress_cache()
+    invalidate_priority_cache()
+    invalidate_schedule_cache()
     
-    logger.info(f"Deleted goal: {goal_id}")
+    logger.info("Deleted goal: %s", goal_id)
     return True
 
 def get_goal_progress(goal_id):
@@ -177,14 +220,20 @@ def get_goal_progress(goal_id):
     if not goal:
         return None
     
-    # Get task statistics
-    total_tasks = goal.tasks.count()
-    completed_tasks = goal.tasks.filter_by(completed=True).count()
+    # Get task statistics in a single aggregate query
+    total_tasks, completed_tasks = db.session.query(
+        func.count(Task.id),
+        func.sum(case((Task.completed == True, 1), else_=0))
+    ).filter(Task.goal_id == goal.id).one()
+    completed_tasks = completed_tasks or 0
+    
+    # Single timestamp for both the days-left and overdue calculations
+    now = datetime.utcnow()
     
     # Calculate days left until end date
     days_left = None
     if goal.end_date:
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
         days_left = (goal.end_date - today).days
     
     # Calculate progress percentage
@@ -192,13 +241,26 @@ def get_goal_progress(goal_id):
     if total_tasks > 0:
         progress_percentage = int((completed_tasks / total_tasks) * 100)
     
-    # Get high priority incomplete tasks
-    high_priority_tasks = goal.tasks.filter_by(completed=False, priority=1).all()
-    
-    # Get overdue tasks
-    now = datetime.utcnow()
-    overdue_tasks = [task for task in goal.tasks.filter_by(completed=False).all() 
-                     if task.deadline and task.deadline < now]
+    # Load only the incomplete tasks that are high priority or overdue,
+    # then partition them in Python
+    flagged_tasks = goal.tasks.filter(
+        Task.completed == False,
+        or_(Task.priority == 1, Task.deadline < now)
+    ).all()
+    
+    # Serialize each task once; overdue high priority tasks appear in both lists
+    high_priority_tasks = []
+    overdue_tasks = []
+    for task in flagged_tasks:
+        task_dict = task.to_dict()
+        
+        # Get high priority incomplete tasks
+        if task.priority == 1:
+            high_priority_tasks.append(task_dict)
+        
+        # Get overdue tasks
+        if task.deadline and task.deadline < now:
+            overdue_tasks.append(task_dict)
     
     return {
         'goal_id': goal.id,
@@ -209,7 +271,7 @@ def get_goal_progress(goal_id):
         'days_left': days_left,
         'start_date': goal.start_date.isoformat() if goal.start_date else None,
         'end_date': goal.end_date.isoformat() if goal.end_date else None,
-        'high_priority_tasks': [task.to_dict() for task in high_priority_tasks],
-        'overdue_tasks': [task.to_dict() for task in overdue_tasks],
+        'high_priority_tasks': high_priority_tasks,
+        'overdue_tasks': overdue_tasks,
         'is_completed': goal.completed
     }
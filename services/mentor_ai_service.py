@@ -9,8 +9,19 @@ Implements the intelligent AI mentor functionality with:
 import logging
 import json
 import os
+from bisect import bisect_right
 from datetime import datetime, timedelta
+from functools import lru_cache
+from time import monotonic
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlalchemy import func, select
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
 
 from app import db
 from models import (
@@ -43,24 +54,254 @@ You are a mentor, not just a task manager. Your goal is to help the student deve
 stay motivated, and achieve their educational and career goals.
 """
 
+# Persona system message, built once and shared by every API call
+PERSONA_MESSAGE = {"role": "system", "content": MENTORA_PERSONA}
+
+# Prompt templates for proactive messages, keyed by message type and
+# whether the schedule details they refer to are available
+PROACTIVE_PROMPTS = {
+    'start_task': "Generate a short, motivational start-of-task reminder for the user who is about to begin '{title}'. Be encouraging and specific.",
+    'start_task_none': "Generate a short, motivational message encouraging the user to start their next task.",
+    'mid_task': "Generate a brief mid-task encouragement for '{title}' with about {time_left} remaining. Acknowledge progress and encourage focus.",
+    'mid_task_none': "Generate a brief message encouraging the user to stay focused on their current task.",
+    'end_task': "Generate a brief end-of-task transition message congratulating the user for completing '{title}' and preparing them for '{next_title}'.",
+    'end_task_none': "Generate a brief message congratulating the user for completing their task and encouraging them to take a short break before continuing.",
+    'evening_summary': "Generate an evening summary for the user who completed {completed} out of {total} tasks today ({completion_rate}% completion rate). Be supportive and forward-looking."
+}
+
+DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+
+# (connect, read) timeouts for Deepseek calls in seconds, overridable from the environment
+DEEPSEEK_TIMEOUT = (
+    float(os.environ.get("DEEPSEEK_CONNECT_TIMEOUT", 3.05)),
+    float(os.environ.get("DEEPSEEK_READ_TIMEOUT", 15))
+)
+
+# Shared HTTP session so Deepseek calls reuse pooled keep-alive connections.
+# Connection failures and overload statuses are retried with exponential
+# backoff; read failures are not, since the request may already be processing.
+_SESSION = requests.Session()
+_SESSION.headers.update({"Content-Type": "application/json"})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        connect=2,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False
+    )
+))
+
+# Circuit breaker: after this many consecutive failures, skip Deepseek calls
+# for DEEPSEEK_CIRCUIT_COOLDOWN seconds instead of stalling each request
+DEEPSEEK_CIRCUIT_THRESHOLD = 5
+DEEPSEEK_CIRCUIT_COOLDOWN = 30
+
+# Consecutive failure count and the monotonic time the circuit stays open until
+_deepseek_failures = 0
+_deepseek_circuit_open_until = 0.0
+
+# How long cached user preferences are reused (in seconds)
+USER_PREFERENCES_TTL = 30
+
+# Cached user preferences as (expires_at, preferences dict or None)
+_user_preferences_cache = None
+
+# Timestamp of the newest saved message, loaded from the database on first use
+# and kept current by the save helpers so proactive polling needs no query
+_last_message_ts = None
+_last_message_loaded = False
+
+# Bisect keys for the cached schedule's slots as (time_slots, start minutes, running max end minutes)
+_slot_search_keys = None
+
+def _dumps(obj):
+    """Serialize an object to a compact JSON string, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
+
+def _loads(data):
+    """Parse JSON bytes or text, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _circuit_open():
+    """Whether Deepseek calls are currently being skipped after repeated failures"""
+    return monotonic() < _deepseek_circuit_open_until
+
+def _record_api_result(success):
+    """
+    Update the circuit breaker after a Deepseek call
+    
+    Args:
+        success: Whether the call returned a usable response
+    """
+    global _deepseek_failures, _deepseek_circuit_open_until
+    
+    if success:
+        _deepseek_failures = 0
+        return
+    
+    _deepseek_failures += 1
+    if _deepseek_failures >= DEEPSEEK_CIRCUIT_THRESHOLD:
+        logger.warning(f"Deepseek API failed {_deepseek_failures} times in a row; "
+                       f"pausing calls for {DEEPSEEK_CIRCUIT_COOLDOWN} seconds")
+        _deepseek_circuit_open_until = monotonic() + DEEPSEEK_CIRCUIT_COOLDOWN
+        _deepseek_failures = 0
+
+def _get_last_message_time(refresh=False):
+    """
+    Get the timestamp of the newest saved message, or None if there are none
+    
+    Args:
+        refresh: Re-read the timestamp from the database, picking up
+            messages saved by other processes
+    """
+    global _last_message_ts, _last_message_loaded
+    
+    if refresh or not _last_message_loaded:
+        _last_message_ts = db.session.execute(select(func.max(AIMessage.timestamp))).scalar_one_or_none()
+        _last_message_loaded = True
+    
+    return _last_message_ts
+
+def _note_message_time(timestamp):
+    """
+    Record that a message was saved
+    
+    Args:
+        timestamp: Timestamp of the saved message
+    """
+    global _last_message_ts
+    
+    if _last_message_ts is None or timestamp > _last_message_ts:
+        _last_message_ts = timestamp
+
+@lru_cache(maxsize=1)
 def get_deepseek_api_key():
-    """Get Deepseek API key from environment variables"""
+    """
+    Get Deepseek API key from environment variables
+    
+    The key is read once per process; call get_deepseek_api_key.cache_clear()
+    to pick up a changed environment.
+    """
     api_key = os.environ.get("DEEPSEEK_API_KEY")
     if not api_key:
         logger.error("DEEPSEEK_API_KEY environment variable not set")
     return api_key
 
-def build_context(user_input=None):
+class _StreamFailed(Exception):
+    """Raised by stream_deepseek_api when the API call fails; the message is the apology to show the user"""
+
+def get_user_preferences():
     """
-    Build the context for AI responses
+    Get the user preferences relevant to the mentor
+    
+    Preferences change rarely, so the result is cached for
+    USER_PREFERENCES_TTL seconds.
+    
+    Returns:
+        Dictionary with user preferences, or None if not set
+    """
+    global _user_preferences_cache
+    
+    now_ts = monotonic()
+    if _user_preferences_cache and _user_preferences_cache[0] > now_ts:
+        return _user_preferences_cache[1]
+    
+    row = db.session.query(
+        UserPreference.theme,
+        UserPreference.enable_voice,
+        UserPreference.do_not_disturb
+    ).first()
+    
+    user_preferences = None
+    if row:
+        user_preferences = {
+            'theme': row.theme,
+            'enable_voice': row.enable_voice,
+            'do_not_disturb': row.do_not_disturb
+        }
+    
+    _user_preferences_cache = (now_ts + USER_PREFERENCES_TTL, user_preferences)
+    return user_preferences
+
+def _fetch_context_bundle():
+    """
+    Fetch the database-backed parts of the mentor context
+    
+    Recent messages are loaded as plain column tuples rather than ORM
+    objects, and user preferences come from the short-lived cache.
+    
+    Returns:
+        Dictionary with recent_interactions and user_preferences
+    """
+    recent_messages = db.session.execute(
+        select(AIMessage.is_from_user, AIMessage.message, AIMessage.timestamp)
+        .order_by(AIMessage.timestamp.desc())
+        .limit(5)
+    ).all()
+    
+    recent_interactions = [
+        {
+            'is_from_user': msg.is_from_user,
+            'message': msg.message,
+            'timestamp': msg.timestamp.isoformat() if msg.timestamp else None
+        }
+        for msg in recent_messages
+    ]
+    
+    return {
+        'recent_interactions': recent_interactions,
+        'user_preferences': get_user_preferences()
+    }
+
+def _get_slot_search_keys(time_slots):
+    """
+    Get bisect keys for a list of time slots sorted by start time
+    
+    The keys are kept for as long as the same (cached) slot list is passed in.
     
     Args:
-        user_input: Optional message from user
+        time_slots: Slot dictionaries from get_today_schedule
         
     Returns:
-        Dictionary with context information
+        Tuple of (start minutes, running max of end minutes)
     """
-    now = datetime.utcnow()
+    global _slot_search_keys
+    
+    if _slot_search_keys is None or _slot_search_keys[0] is not time_slots:
+        start_minutes = [slot['start_minute'] for slot in time_slots]
+        max_end_minutes = []
+        max_end = -1
+        for slot in time_slots:
+            max_end = max(max_end, slot['end_minute'])
+            max_end_minutes.append(max_end)
+        _slot_search_keys = (time_slots, start_minutes, max_end_minutes)
+    
+    return _slot_search_keys[1], _slot_search_keys[2]
+
+def build_schedule_context(now=None):
+    """
+    Build the time and schedule portion of the AI context
+    
+    This only reads today's (cached) schedule, so it is cheap enough for
+    proactive-message polling.
+    
+    Args:
+        now: Current UTC datetime, defaults to now
+        
+    Returns:
+        Dictionary with time_context, current_task, next_task and time_left
+    """
+    if now is None:
+        now = datetime.utcnow()
     
     # Get current time context
     time_context = {
@@ -71,7 +312,8 @@ def build_context(user_input=None):
     
     # Get current task from schedule
     from services.blueprint_service import get_today_schedule
-    schedule = get_today_schedule()
+    # Read-only use, so the cached payload is not copied
+    schedule = get_today_schedule(shared=True)
     
     current_task = None
     next_task = None
@@ -80,28 +322,43 @@ def build_context(user_input=None):
     if schedule.get('has_schedule', False):
         time_slots = schedule.get('time_slots', [])
         
-        # Convert current time to comparable format
-        current_hour, current_minute = map(int, time_context['current_time'].split(':'))
+        # Compare times as minutes since midnight
+        current_minute = now.hour * 60 + now.minute
+        start_minutes, max_end_minutes = _get_slot_search_keys(time_slots)
         
-        for slot in time_slots:
-            # Parse start and end times
-            start_hour, start_minute = map(int, slot['start_time'].split(':'))
-            end_hour, end_minute = map(int, slot['end_time'].split(':'))
-            
-            # Check if current time is within this slot
-            if (current_hour > start_hour or (current_hour == start_hour and current_minute >= start_minute)) and \
-               (current_hour < end_hour or (current_hour == end_hour and current_minute < end_minute)):
-                current_task = slot
-                
-                # Calculate time left in minutes
-                time_left_minutes = (end_hour - current_hour) * 60 + (end_minute - current_minute)
-                time_left = f"{time_left_minutes} minutes"
-                break
+        # Slots before this index have started; the first of them still
+        # running is the first whose running max end lies past now
+        started = bisect_right(start_minutes, current_minute)
+        running = bisect_right(max_end_minutes, current_minute)
+        
+        if running < started:
+            current_task = time_slots[running]
             
+            # Calculate time left in minutes
+            time_left = f"{current_task['end_minute'] - current_minute} minutes"
+        elif started < len(time_slots):
             # Find the next task
-            if not next_task and (current_hour < start_hour or (current_hour == start_hour and current_minute < start_minute)):
-                next_task = slot
-                break
+            next_task = time_slots[started]
+    
+    return {
+        'time_context': time_context,
+        'current_task': current_task,
+        'next_task': next_task,
+        'time_left': time_left
+    }
+
+def build_context(user_input=None):
+    """
+    Build the context for AI responses
+    
+    Args:
+        user_input: Optional message from user
+        
+    Returns:
+        Dictionary with context information
+    """
+    schedule_context = build_schedule_context()
+    current_task = schedule_context['current_task']
     
     # If we don't have a current task from schedule, get next suggested task
     suggested_task = None
@@ -121,38 +378,20 @@ def build_context(user_input=None):
     progress_stats = get_overall_progress()
     progress_insights = get_progress_insights()
     
-    # Get recent interactions
-    recent_messages = AIMessage.query.order_by(AIMessage.timestamp.desc()).limit(5).all()
-    recent_interactions = [
-        {
-            'is_from_user': msg.is_from_user,
-            'message': msg.message,
-            'timestamp': msg.timestamp.isoformat() if msg.timestamp else None
-        }
-        for msg in recent_messages
-    ]
-    
-    # Get user preferences
-    user_prefs = UserPreference.query.first()
-    user_preferences = None
-    if user_prefs:
-        user_preferences = {
-            'theme': user_prefs.theme,
-            'enable_voice': user_prefs.enable_voice,
-            'do_not_disturb': user_prefs.do_not_disturb
-        }
+    # Get recent interactions and user preferences
+    bundle = _fetch_context_bundle()
     
     # Build the complete context
     context = {
-        'time_context': time_context,
+        'time_context': schedule_context['time_context'],
         'current_task': current_task,
-        'next_task': next_task,
-        'time_left': time_left,
+        'next_task': schedule_context['next_task'],
+        'time_left': schedule_context['time_left'],
         'suggested_task': suggested_task,
         'progress_stats': progress_stats,
         'progress_insights': progress_insights,
-        'recent_interactions': recent_interactions,
-        'user_preferences': user_preferences,
+        'recent_interactions': bundle['recent_interactions'],
+        'user_preferences': bundle['user_preferences'],
         'user_input': user_input
     }
     
@@ -172,63 +411,224 @@ def call_deepseek_api(messages):
     if not api_key:
         return "I'm sorry, but I can't access my AI capabilities right now. Please check the API configuration."
     
+    if _circuit_open():
+        return "I'm sorry, but I encountered an issue connecting to my AI capabilities. Please try again later."
+    
     try:
-        response = requests.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
+        response = _SESSION.post(
+            DEEPSEEK_API_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            data=_dumps({
                 "model": "deepseek-chat",  # Using deepseek-chat model
                 "messages": messages,
                 "max_tokens": 500,
                 "temperature": 0.7
-            },
-            timeout=15
+            }).encode('utf-8'),
+            timeout=DEEPSEEK_TIMEOUT
         )
         
         if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+            content = _loads(response.content)["choices"][0]["message"]["content"]
+            _record_api_result(True)
+            return content
         else:
             logger.error(f"Deepseek API error: {response.status_code} - {response.text}")
+            _record_api_result(False)
             return "I'm sorry, but I encountered an issue processing your request. Please try again later."
     
     except Exception as e:
         logger.error(f"Error calling Deepseek API: {str(e)}")
+        _record_api_result(False)
         return "I'm sorry, but I encountered an issue connecting to my AI capabilities. Please try again later."
 
-def get_user_response(user_message):
+def stream_deepseek_api(messages):
     """
-    Generate an AI response to a user message with full context awareness
+    Call Deepseek API with streaming enabled and yield text as it arrives
+    
+    Args:
+        messages: List of message objects (role, content)
+        
+    Yields:
+        Chunks of the AI response text
+        
+    Raises:
+        _StreamFailed: If the API cannot be reached or the stream breaks off;
+            chunks already yielded are the partial reply
+    """
+    api_key = get_deepseek_api_key()
+    if not api_key:
+        raise _StreamFailed("I'm sorry, but I can't access my AI capabilities right now. Please check the API configuration.")
+    
+    if _circuit_open():
+        raise _StreamFailed("I'm sorry, but I encountered an issue connecting to my AI capabilities. Please try again later.")
+    
+    try:
+        response = _SESSION.post(
+            DEEPSEEK_API_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            data=_dumps({
+                "model": "deepseek-chat",  # Using deepseek-chat model
+                "messages": messages,
+                "max_tokens": 500,
+                "temperature": 0.7,
+                "stream": True
+            }).encode('utf-8'),
+            timeout=DEEPSEEK_TIMEOUT,
+            stream=True
+        )
+        
+        with response:
+            if response.status_code != 200:
+                logger.error(f"Deepseek API error: {response.status_code} - {response.text}")
+                _record_api_result(False)
+                raise _StreamFailed("I'm sorry, but I encountered an issue processing your request. Please try again later.")
+            
+            # Server-sent events: one "data: {...}" line per chunk
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+                
+                content = _loads(data)["choices"][0]["delta"].get("content")
+                if content:
+                    yield content
+        
+        _record_api_result(True)
+    
+    except _StreamFailed:
+        raise
+    
+    except Exception as e:
+        logger.error(f"Error streaming from Deepseek API: {str(e)}")
+        _record_api_result(False)
+        raise _StreamFailed("I'm sorry, but I encountered an issue connecting to my AI capabilities. Please try again later.")
+
+def stream_user_response(user_message):
+    """
+    Generate an AI response to a user message, yielding text as it arrives
+    
+    The full interaction is saved once the response is complete.
     
     Args:
         user_message: Text message from the user
         
-    Returns:
-        AI response text
+    Yields:
+        Chunks of the AI response text
     """
     # Build context for the request
     context = build_context(user_message)
     
-    # Format the context as a string for the prompt
-    context_str = json.dumps(context, indent=2)
+    # Format the context as a compact string for the prompt
+    context_str = _dumps(context)
     
-    # Create messages for the API call
+    # Create messages for the API call, keeping the static persona separate
+    # from the per-request context
     messages = [
-        {"role": "system", "content": MENTORA_PERSONA + "\n\nCurrent context:\n" + context_str},
+        PERSONA_MESSAGE,
+        {"role": "system", "content": "Current context:\n" + context_str},
         {"role": "user", "content": user_message}
     ]
     
-    # Call the API
-    response_text = call_deepseek_api(messages)
+    # Stamp the user message before waiting on the API
+    user_msg = _make_user_msg(user_message)
     
-    # Save the interaction
-    save_user_message(user_message)
-    ai_message = save_ai_message(response_text)
+    # Stream the API response, keeping the chunks for saving
+    chunks = []
+    try:
+        try:
+            for chunk in stream_deepseek_api(messages):
+                chunks.append(chunk)
+                yield chunk
+        except _StreamFailed as e:
+            # Show the apology but keep it out of the saved reply
+            yield ("\n\n" if chunks else "") + str(e)
+    finally:
+        # Runs on completion, failure and client disconnect alike
+        _save_interaction(user_msg, "".join(chunks))
+
+def _save_interaction(user_msg, reply_text):
+    """
+    Save a user message and the reply it received in a single transaction
+    
+    Args:
+        user_msg: Unsaved user AIMessage
+        reply_text: Text of the AI reply; if empty, only the user message is saved
+    """
+    if not reply_text:
+        db.session.add(user_msg)
+        db.session.commit()
+        _note_message_time(user_msg.timestamp)
+        logger.info(f"Saved user message {user_msg.id} without an AI response")
+        return
+    
+    # Link the reply to the user message once its ID has been assigned
+    ai_message = _make_ai_msg(reply_text)
+    db.session.add_all([user_msg, ai_message])
+    db.session.flush()
+    ai_message.response_to = user_msg.id
+    db.session.commit()
+    _note_message_time(ai_message.timestamp)
     
     logger.info(f"Generated AI response: {ai_message.id}")
-    return response_text
+
+def get_user_response(user_message):
+    """
+    Generate an AI response to a user message with full context awareness
+    
+    Args:
+        user_message: Text message from the user
+        
+    Returns:
+        AI response text
+    """
+    return "".join(stream_user_response(user_message))
+
+def _gen_start(context):
+    """Build the prompt for a start-of-task message"""
+    current_task = context['current_task']
+    if current_task:
+        return PROACTIVE_PROMPTS['start_task'].format_map(current_task)
+    return PROACTIVE_PROMPTS['start_task_none']
+
+def _gen_mid(context):
+    """Build the prompt for a mid-task message"""
+    current_task = context['current_task']
+    if current_task and context['time_left']:
+        return PROACTIVE_PROMPTS['mid_task'].format(
+            title=current_task['title'],
+            time_left=context['time_left']
+        )
+    return PROACTIVE_PROMPTS['mid_task_none']
+
+def _gen_end(context):
+    """Build the prompt for an end-of-task message"""
+    current_task = context['current_task']
+    if current_task and context['next_task']:
+        return PROACTIVE_PROMPTS['end_task'].format(
+            title=current_task['title'],
+            next_title=context['next_task']['title']
+        )
+    return PROACTIVE_PROMPTS['end_task_none']
+
+def _gen_evening(context):
+    """Build the prompt for an evening summary"""
+    stats = context['progress_stats']
+    return PROACTIVE_PROMPTS['evening_summary'].format(
+        completed=stats.get('completed_tasks', 0),
+        total=stats.get('total_tasks', 0),
+        completion_rate=stats.get('completion_rate', 0)
+    )
+
+# Prompt builders for proactive messages, keyed by message type
+_GEN_HANDLERS = {
+    'start_task': _gen_start,
+    'mid_task': _gen_mid,
+    'end_task': _gen_end,
+    'evening_summary': _gen_evening
+}
 
 def generate_proactive_message(message_type):
     """
@@ -243,40 +643,12 @@ def generate_proactive_message(message_type):
     context = build_context()
     
     # Create a prompt based on the message type
-    prompt = ""
-    if message_type == 'start_task':
-        if context['current_task']:
-            task = context['current_task']
-            prompt = f"Generate a short, motivational start-of-task reminder for the user who is about to begin '{task['title']}'. Be encouraging and specific."
-        else:
-            prompt = "Generate a short, motivational message encouraging the user to start their next task."
-    
-    elif message_type == 'mid_task':
-        if context['current_task'] and context['time_left']:
-            task = context['current_task']
-            prompt = f"Generate a brief mid-task encouragement for '{task['title']}' with about {context['time_left']} remaining. Acknowledge progress and encourage focus."
-        else:
-            prompt = "Generate a brief message encouraging the user to stay focused on their current task."
-    
-    elif message_type == 'end_task':
-        if context['current_task'] and context['next_task']:
-            current = context['current_task']
-            next_task = context['next_task']
-            prompt = f"Generate a brief end-of-task transition message congratulating the user for completing '{current['title']}' and preparing them for '{next_task['title']}'."
-        else:
-            prompt = "Generate a brief message congratulating the user for completing their task and encouraging them to take a short break before continuing."
-    
-    elif message_type == 'evening_summary':
-        stats = context['progress_stats']
-        completed = stats.get('completed_tasks', 0)
-        total = stats.get('total_tasks', 0)
-        completion_rate = stats.get('task_completion_rate', 0)
-        
-        prompt = f"Generate an evening summary for the user who completed {completed} out of {total} tasks today ({completion_rate}% completion rate). Be supportive and forward-looking."
+    handler = _GEN_HANDLERS.get(message_type)
+    prompt = handler(context) if handler else ""
     
     # Create messages for the API call
     messages = [
-        {"role": "system", "content": MENTORA_PERSONA},
+        PERSONA_MESSAGE,
         {"role": "user", "content": prompt}
     ]
     
@@ -284,7 +656,7 @@ def generate_proactive_message(message_type):
     response_text = call_deepseek_api(messages)
     
     # Save the interaction (as AI-initiated)
-    ai_message = save_ai_message(response_text, is_proactive=True)
+    ai_message = save_ai_message(response_text, is_proactive=True, kind=message_type)
     
     logger.info(f"Generated proactive message ({message_type}): {ai_message.id}")
     return response_text
@@ -309,28 +681,61 @@ def get_all_messages(limit=100, newest_first=True):
     
     return query.limit(limit).all()
 
-def save_user_message(message_text):
+def _make_user_msg(message_text):
     """
-    Save a user message to the database
+    Build an unsaved user message
     
     Args:
         message_text: The message text
         
     Returns:
-        Newly created AIMessage object
+        AIMessage object not yet added to the session
     """
-    message = AIMessage(
+    return AIMessage(
         is_from_user=True,
         message=message_text,
         timestamp=datetime.utcnow()
     )
+
+def _make_ai_msg(message_text, response_to=None, kind=None):
+    """
+    Build an unsaved AI message
+    
+    Args:
+        message_text: The message text
+        response_to: ID of the user message this is responding to
+        kind: Type of proactive message (e.g. 'evening_summary'), if any
+        
+    Returns:
+        AIMessage object not yet added to the session
+    """
+    return AIMessage(
+        is_from_user=False,
+        message=message_text,
+        response_to=response_to,
+        kind=kind,
+        timestamp=datetime.utcnow()
+    )
+
+def save_user_message(message_text):
+    """
+    Save a user message to the database
+    
+    Args:
+        message_text: The message text
+        
+    Returns:
+        Newly created AIMessage object
+    """
+    message = _make_user_msg(message_text)
     
     db.session.add(message)
     db.session.commit()
+    _note_message_time(message.timestamp)
     
     return message
 
-def save_ai_message(message_text, response_to=None, is_proactive=False):
+def save_ai_message(message_text, response_to=None, is_proactive=False, kind=None):
     """
     Save an AI message to the database
     
@@ -338,19 +743,16 @@ def save_ai_message(message_text, response_to=None, is_proactive=False):
         message_text: The message text
         response_to: ID of the user message this is responding to
         is_proactive: Whether this is a proactive message
+        kind: Type of proactive message (e.g. 'evening_summary'), if any
         
     Returns:
         Newly created AIMessage object
     """
-    message = AIMessage(
-        is_from_user=False,
-        message=message_text,
-        response_to=response_to,
-        timestamp=datetime.utcnow()
-    )
+    message = _make_ai_msg(message_text, response_to=response_to, kind=kind)
     
     db.session.add(message)
     db.session.commit()
+    _note_message_time(message.timestamp)
     
     return message
 
@@ -377,6 +779,68 @@ def record_feedback(message_id, is_helpful):
     
     return True
 
+def _check_evening(now):
+    """Whether an evening summary is due"""
+    # Check if it's evening (between 6pm and 9pm)
+    if not 18 <= now.hour <= 21:
+        return False
+    
+    # Check if we've already sent an evening summary today
+    evening_start = now.replace(hour=18, minute=0, second=0, microsecond=0)
+    
+    # Look for evening summaries today (served by the kind/timestamp index)
+    recent_summary = db.session.query(AIMessage.id).filter(
+        AIMessage.kind == 'evening_summary',
+        AIMessage.timestamp >= evening_start
+    ).first()
+    
+    return recent_summary is None
+
+def _check_start(now):
+    """Whether the current task started within the last 5 minutes"""
+    # Task-based checks only need the schedule, not the full AI context
+    task = build_schedule_context(now)['current_task']
+    if not task:
+        return False
+    
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    task_start = midnight + timedelta(minutes=task['start_minute'])
+    
+    return (now - task_start).total_seconds() <= 300
+
+def _check_mid(now):
+    """Whether we're approximately halfway through the current task"""
+    context = build_schedule_context(now)
+    task = context['current_task']
+    if not (task and context['time_left']):
+        return False
+    
+    time_left_minutes = int(context['time_left'].split()[0])
+    
+    # Calculate total task duration
+    total_minutes = task['end_minute'] - task['start_minute']
+    
+    return abs(time_left_minutes - (total_minutes / 2)) < 5
+
+def _check_end(now):
+    """Whether the current task ends within the next 5 minutes"""
+    task = build_schedule_context(now)['current_task']
+    if not task:
+        return False
+    
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    task_end = midnight + timedelta(minutes=task['end_minute'])
+    
+    return 0 < (task_end - now).total_seconds() <= 300
+
+# Timing checks for proactive messages, keyed by message type
+_CHECK_HANDLERS = {
+    'evening_summary': _check_evening,
+    'start_task': _check_start,
+    'mid_task': _check_mid,
+    'end_task': _check_end
+}
+
 def should_send_proactive_message(message_type):
     """
     Determine if a proactive message should be sent based on current context
@@ -388,68 +852,23 @@ def should_send_proactive_message(message_type):
         True if a message should be sent, False otherwise
     """
     # Get user preferences
-    user_prefs = UserPreference.query.first()
-    if user_prefs and user_prefs.do_not_disturb:
+    user_prefs = get_user_preferences()
+    if user_prefs and user_prefs['do_not_disturb']:
         return False
     
-    context = build_context()
     now = datetime.utcnow()
     
-    # Check the last message time to avoid sending too many messages
-    last_message = AIMessage.query.order_by(AIMessage.timestamp.desc()).first()
-    if last_message and (now - last_message.timestamp).total_seconds() < 300:  # 5 minutes
+    # Check the last message time to avoid sending too many messages; the
+    # cached time only covers this process, so an expired cooldown is
+    # confirmed against the database
+    last_timestamp = _get_last_message_time()
+    if not last_timestamp or (now - last_timestamp).total_seconds() >= 300:
+        last_timestamp = _get_last_message_time(refresh=True)
+    if last_timestamp and (now - last_timestamp).total_seconds() < 300:  # 5 minutes
         return False
     
-    if message_type == 'evening_summary':
-        # Check if it's evening (between 6pm and 9pm)
-        hour = now.hour
-        if 18 <= hour <= 21:
-            # Check if we've already sent an evening summary today
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            evening_start = now.replace(hour=18, minute=0, second=0, microsecond=0)
-            
-            # Look for evening summaries today
-            recent_summary = AIMessage.query.filter(
-                AIMessage.timestamp >= evening_start,
-                AIMessage.is_from_user == False,
-                AIMessage.message.like('%today you completed%')
-            ).first()
-            
-            return recent_summary is None
-    
-    elif message_type == 'start_task':
-        # Send if there's a current task that just started (within 5 minutes)
-        if context['current_task']:
-            task = context['current_task']
-            start_time = task['start_time']
-            start_hour, start_minute = map(int, start_time.split(':'))
-            task_start = now.replace(hour=start_hour, minute=start_minute, second=0, microsecond=0)
-            
-            return (now - task_start).total_seconds() <= 300
-    
-    elif message_type == 'mid_task':
-        # Send if we're in the middle of a task
-        if context['current_task'] and context['time_left']:
-            time_left_minutes = int(context['time_left'].split()[0])
-            total_minutes = 0
-            
-            # Calculate total task duration
-            task = context['current_task']
-            start_hour, start_minute = map(int, task['start_time'].split(':'))
-            end_hour, end_minute = map(int, task['end_time'].split(':'))
-            total_minutes = (end_hour - start_hour) * 60 + (end_minute - start_minute)
-            
-            # Send if we're approximately halfway through
-            return abs(time_left_minutes - (total_minutes / 2)) < 5
-    
-    elif message_type == 'end_task':
-        # Send if a task is about to end (within 5 minutes)
-        if context['current_task']:
-            task = context['current_task']
-            end_time = task['end_time']
-            end_hour, end_minute = map(int, end_time.split(':'))
-            task_end = now.replace(hour=end_hour, minute=end_minute, second=0, microsecond=0)
-            
-            return 0 < (task_end - now).total_seconds() <= 300
+    handler = _CHECK_HANDLERS.get(message_type)
+    if handler is None:
+        return False
     
-    return False
\ No newline at end of file
+    return handler(now)
\ No newline at end of file
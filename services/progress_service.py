@@ -3,38 +3,113 @@ Progress Service for Mentora application
 Provides high-level interfaces for progress tracking, analytics, and insights
 """
 import logging
-from datetime import datetime, timedelta
-from utils.progress_engine import get_daily_metrics, get_weekly_metrics
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, case
+
+from app import db
+from models import Task, Goal
+from utils.cache import ttl_cache
+from utils.progress_engine import (
+    get_current_streak,
+    get_daily_metrics_range,
+    get_time_by_category,
+    invalidate_daily_metrics_cache,
+    invalidate_streak_cache
+)
+from utils.reward_system import invalidate_badge_cache
+
+__all__ = [
+    'get_overall_progress',
+    'invalidate_progress_cache',
+    'get_recent_progress',
+    'get_progress_insights'
+]
 
 logger = logging.getLogger(__name__)
 
+# How long overall progress metrics are reused (in seconds)
+OVERALL_PROGRESS_TTL = 60
+
+@ttl_cache(OVERALL_PROGRESS_TTL)
 def get_overall_progress():
     """
     Get overall progress metrics across all goals and tasks
     
+    Results are cached for OVERALL_PROGRESS_TTL seconds; call
+    invalidate_progress_cache() after changing tasks or goals.
+    
     Returns:
         Dictionary with overall progress metrics
     """
     # Get progress for last 30 days
+    days = 30
     end_date = datetime.utcnow().date()
-    start_date = end_date - timedelta(days=29)
+    start_date = end_date - timedelta(days=days-1)
     
-    # Get weekly metrics
-    weekly_metrics = get_weekly_metrics(end_date, days=30)
+    window_start = datetime.combine(start_date, datetime.min.time())
+    window_end = datetime.combine(end_date, datetime.max.time())
+    
+    now = datetime.utcnow()
+    in_window = Task.deadline.between(window_start, window_end)
+    
+    # Goals completed in the window, folded into the task query below
+    completed_goals_count = db.session.query(func.count(Goal.id)).filter(
+        Goal.updated_at.between(window_start, window_end),
+        Goal.completed == True
+    ).scalar_subquery()
+    
+    # Window task counts, overdue tasks and completed goals in one round-trip
+    total_tasks, completed_tasks, overdue_tasks, completed_goals = db.session.query(
+        func.sum(case((in_window, 1), else_=0)),
+        func.sum(case(((in_window) & (Task.completed == True), 1), else_=0)),
+        func.sum(case(((Task.completed == False) & (Task.deadline < now), 1), else_=0)),
+        completed_goals_count
+    ).filter(
+        Task.deadline <= window_end
+    ).one()
+    total_tasks = total_tasks or 0
+    completed_tasks = completed_tasks or 0
+    overdue_tasks = overdue_tasks or 0
+    
+    # Time slots repeat every day, so scale one day's hours by the window length
+    daily_time_by_category = get_time_by_category()
+    daily_time_spent = round(sum(daily_time_by_category.values()), 1)
+    
+    completion_rate = 0
+    if total_tasks > 0:
+        completion_rate = round((completed_tasks / total_tasks) * 100, 1)
     
-    # Extract relevant metrics
     overall = {
-        "total_tasks": weekly_metrics["total_tasks"],
-        "completed_tasks": weekly_metrics["completed_tasks"],
-        "completion_rate": weekly_metrics["completion_rate"],
-        "completed_goals": weekly_metrics["completed_goals"],
-        "total_time_spent": weekly_metrics["total_time_spent"],
-        "streak": weekly_metrics["streak"],
-        "time_by_category": weekly_metrics["time_by_category"]
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "completion_rate": completion_rate,
+        # Older callers read the rate under this name
+        "task_completion_rate": completion_rate,
+        "overdue_tasks": overdue_tasks,
+        "completed_goals": completed_goals,
+        "total_time_spent": round(daily_time_spent * days, 1),
+        "streak": get_current_streak(),
+        "time_by_category": {
+            category: round(hours * days, 1)
+            for category, hours in daily_time_by_category.items()
+        }
     }
     
     return overall
 
+def invalidate_progress_cache():
+    """
+    Invalidate cached overall progress, daily metrics, streak and badge checks
+    
+    Must be called whenever tasks or goals change.
+    """
+    get_overall_progress.cache_clear()
+    invalidate_daily_metrics_cache()
+    invalidate_streak_cache()
+    invalidate_badge_cache()
+
 def get_recent_progress(days=7):
     """
     Get daily progress metrics for recent days
@@ -48,17 +123,12 @@ def get_recent_progress(days=7):
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=days-1)
     
-    daily_metrics = []
-    current_date = start_date
+    daily_metrics = get_daily_metrics_range(start_date, end_date)
     
-    while current_date <= end_date:
-        metrics = get_daily_metrics(current_date)
-        
+    for offset, metrics in enumerate(daily_metrics):
         # Format the date for better readability
+        current_date = start_date + timedelta(days=offset)
         metrics["formatted_date"] = current_date.strftime("%a, %b %d")
-        
-        daily_metrics.append(metrics)
-        current_date += timedelta(days=1)
     
     return {
         "days": days,
@@ -93,12 +163,9 @@ def get_progress_insights():
     if all(rate < 50 for rate in completion_rates[-3:]):
         insights["patterns"].append("Several days of low task completion")
     
-    # Check for weekend patterns
-    weekend_rates = []
-    for i, day in enumerate(recent["metrics"]):
-        date = datetime.strptime(day["date"], "%Y-%m-%d")
-        if date.weekday() >= 5:  # 5 and 6 are Saturday and Sunday
-            weekend_rates.append(day["completion_rate"])
+    # Check for weekend patterns (weekday 5 and 6 are Saturday and Sunday)
+    weekend_rates = [day["completion_rate"] for day in recent["metrics"]
+                     if date.fromisoformat(day["date"]).weekday() >= 5]
     
     if weekend_rates and sum(weekend_rates) / len(weekend_rates) < 30:
         insights["patterns"].append("Low productivity on weekends")
@@ -120,16 +187,12 @@ def get_progress_insights():
         insights["areas_for_improvement"].append(f"Currently have {overdue} overdue tasks")
     
     # Check for most productive categories
-    time_by_category = {}
+    time_by_category = Counter()
     for day in recent["metrics"]:
-        for category, time in day.get("time_by_category", {}).items():
-            if category in time_by_category:
-                time_by_category[category] += time
-            else:
-                time_by_category[category] = time
+        time_by_category.update(day.get("time_by_category", {}))
     
     if time_by_category:
-        most_time_category = max(time_by_category.items(), key=lambda x: x[1])
+        most_time_category = time_by_category.most_common(1)[0]
         insights["strengths"].append(f"Most time invested in: {most_time_category[0]}")
         
         # Check for neglected categories
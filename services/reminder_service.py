@@ -6,6 +6,7 @@ import logging
 from datetime import datetime, timedelta
 from app import db
 from models import Reminder, Task
+from utils.data_validator import parse_iso_datetime
 
 logger = logging.getLogger(__name__)
 
@@ -56,38 +57,51 @@ def get_reminders_by_task(task_id, triggered=None):
     
     return query.all()
 
-def create_reminder(task_id, reminder_time, message=None):
+def _build_reminder(task, reminder_time, message=None):
     """
-    Create a new reminder
+    Build an unsaved reminder for a task
     
     Args:
-        task_id: Associated task ID
+        task: Task object the reminder belongs to
         reminder_time: Time to trigger reminder (ISO format string or datetime)
         message: Reminder message
     
     Returns:
-        Newly created Reminder object
+        Reminder object not yet added to the session
     """
-    # Ensure task exists
-    task = Task.query.get(task_id)
-    if not task:
-        logger.error(f"Cannot create reminder: Task {task_id} not found")
-        return None
-    
     # Convert string date to datetime if necessary
     if isinstance(reminder_time, str):
-        reminder_time = datetime.fromisoformat(reminder_time.replace('Z', '+00:00'))
+        reminder_time = parse_iso_datetime(reminder_time)
     
     # Generate default message if none provided
     if not message:
         message = f"Reminder for task: {task.title}"
     
-    # Create reminder
-    reminder = Reminder(
-        task_id=task_id,
+    return Reminder(
+        task_id=task.id,
         reminder_time=reminder_time,
         message=message
     )
+
+def create_reminder(task_id, reminder_time, message=None):
+    """
+    Create a new reminder
+    
+    Args:
+        task_id: Associated task ID
+        reminder_time: Time to trigger reminder (ISO format string or datetime)
+        message: Reminder message
+    
+    Returns:
+        Newly created Reminder object
+    """
+    # Ensure task exists
+    task = Task.query.get(task_id)
+    if not task:
+        logger.error(f"Cannot create reminder: Task {task_id} not found")
+        return None
+    
+    reminder = _build_reminder(task, reminder_time, message)
     
     db.session.add(reminder)
     db.session.commit()
@@ -125,7 +139,7 @@ def update_reminder(reminder_id, task_id=None, reminder_time=None, message=None,
     
     if reminder_time is not None:
         if isinstance(reminder_time, str):
-            reminder_time = datetime.fromisoformat(reminder_time.replace('Z', '+00:00'))
+            reminder_time = parse_iso_datetime(reminder_time)
         reminder.reminder_time = reminder_time
     
     if message is not None:
@@ -179,26 +193,30 @@ def create_default_reminders_for_task(task_id):
         return None
     
     created_reminders = []
+    now = datetime.utcnow()
     
     # Create a reminder for 1 day before deadline
     one_day_before = task.deadline - timedelta(days=1)
-    if one_day_before > datetime.utcnow():
-        reminder = create_reminder(
-            task_id, 
+    if one_day_before > now:
+        created_reminders.append(_build_reminder(
+            task, 
             one_day_before, 
             f"Task '{task.title}' is due tomorrow!"
-        )
-        created_reminders.append(reminder)
+        ))
     
     # Create a reminder for 1 hour before deadline
     one_hour_before = task.deadline - timedelta(hours=1)
-    if one_hour_before > datetime.utcnow():
-        reminder = create_reminder(
-            task_id, 
+    if one_hour_before > now:
+        created_reminders.append(_build_reminder(
+            task, 
             one_hour_before, 
             f"Task '{task.title}' is due in 1 hour!"
-        )
-        created_reminders.append(reminder)
+        ))
+    
+    # Save all default reminders in one transaction
+    if created_reminders:
+        db.session.add_all(created_reminders)
+        db.session.commit()
     
     logger.info(f"Created {len(created_reminders)} default reminders for task {task_id}")
     return created_reminders
@@ -4,38 +4,71 @@ Handles intelligent time-block allocation and task scheduling based on blueprint
 """
 import logging
 import json
+import threading
 from datetime import datetime, timedelta, time
 from app import db
 from models import Category, Goal, Task, Blueprint, TimeSlot
+from services.blueprint_service import invalidate_schedule_cache
+from services.progress_service import invalidate_progress_cache
+from utils.priority_engine import invalidate_priority_cache
 
 logger = logging.getLogger(__name__)
 
-# Define time block ranges with more granular slots
+# Define time block ranges with more granular slots, as (start, end) times
 MORNING_SLOTS = [
-    {"start": "06:00", "end": "06:50"},
-    {"start": "07:00", "end": "07:50"},
-    {"start": "08:00", "end": "08:50"},
-    {"start": "09:00", "end": "09:50"},
-    {"start": "10:00", "end": "10:50"},
-    {"start": "11:00", "end": "11:50"}
+    (time(6, 0), time(6, 50)),
+    (time(7, 0), time(7, 50)),
+    (time(8, 0), time(8, 50)),
+    (time(9, 0), time(9, 50)),
+    (time(10, 0), time(10, 50)),
+    (time(11, 0), time(11, 50))
 ]
 
 AFTERNOON_SLOTS = [
-    {"start": "12:00", "end": "12:50"},
-    {"start": "13:00", "end": "13:50"},
-    {"start": "14:00", "end": "14:50"},
-    {"start": "15:00", "end": "15:50"},
-    {"start": "16:00", "end": "16:50"}
+    (time(12, 0), time(12, 50)),
+    (time(13, 0), time(13, 50)),
+    (time(14, 0), time(14, 50)),
+    (time(15, 0), time(15, 50)),
+    (time(16, 0), time(16, 50))
 ]
 
 EVENING_SLOTS = [
-    {"start": "17:00", "end": "17:50"},
-    {"start": "18:00", "end": "18:50"},
-    {"start": "19:00", "end": "19:50"},
-    {"start": "20:00", "end": "20:50"},
-    {"start": "21:00", "end": "21:50"}
+    (time(17, 0), time(17, 50)),
+    (time(18, 0), time(18, 50)),
+    (time(19, 0), time(19, 50)),
+    (time(20, 0), time(20, 50)),
+    (time(21, 0), time(21, 50))
 ]
 
+# Every slot in the day; slots are referred to by their index in this list
+ALL_SLOTS = MORNING_SLOTS + AFTERNOON_SLOTS + EVENING_SLOTS
+
+MORNING_SLOT_INDICES = tuple(range(len(MORNING_SLOTS)))
+AFTERNOON_SLOT_INDICES = tuple(range(len(MORNING_SLOTS), len(MORNING_SLOTS) + len(AFTERNOON_SLOTS)))
+EVENING_SLOT_INDICES = tuple(range(len(MORNING_SLOTS) + len(AFTERNOON_SLOTS), len(ALL_SLOTS)))
+ALL_SLOT_INDICES = tuple(range(len(ALL_SLOTS)))
+
+# Preferred slot indices for each category, in order of preference
+CATEGORY_SLOT_PREFERENCES = {
+    "Class 11": MORNING_SLOT_INDICES,
+    "AI Tools": MORNING_SLOT_INDICES + AFTERNOON_SLOT_INDICES,
+    "Freelancing": AFTERNOON_SLOT_INDICES + EVENING_SLOT_INDICES,
+    "Certifications": AFTERNOON_SLOT_INDICES,
+    "Career Planning": EVENING_SLOT_INDICES
+}
+
+# Days of the week, in schedule order
+ALL_DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Preferred days for each category; other categories may use any day
+DAY_PREFERENCES = {
+    "Class 11": frozenset(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]),
+    "AI Tools": frozenset(["Monday", "Wednesday", "Friday"]),
+    "Freelancing": frozenset(["Tuesday", "Thursday", "Saturday"]),
+    "Certifications": frozenset(["Monday", "Wednesday", "Friday"]),
+    "Career Planning": frozenset(["Saturday", "Sunday"])
+}
+
 # Desired category balance (in percentage)
 CATEGORY_BALANCE = {
     "Class 11": 40,
@@ -45,6 +78,40 @@ CATEGORY_BALANCE = {
     "Career Planning": 10
 }
 
+# Set when a task change means the weekly schedule should be rebuilt; the
+# rebuild is deferred until the schedule is next read
+_schedule_dirty = False
+_schedule_dirty_lock = threading.Lock()
+
+def mark_schedule_dirty():
+    """Flag the weekly schedule for regeneration on its next read"""
+    global _schedule_dirty
+    
+    with _schedule_dirty_lock:
+        _schedule_dirty = True
+
+def regenerate_if_dirty():
+    """
+    Regenerate the weekly schedule if a task change has flagged it
+    
+    Several snoozes or missed tasks in a row are folded into one rebuild.
+    
+    Returns:
+        Boolean indicating success (True if nothing needed rebuilding)
+    """
+    global _schedule_dirty
+    
+    with _schedule_dirty_lock:
+        if not _schedule_dirty:
+            return True
+        
+        _schedule_dirty = False
+        success = generate_weekly_schedule()
+        if not success:
+            # Try again on the next read
+            _schedule_dirty = True
+        return success
+
 def generate_weekly_schedule():
     """
     Generate a complete weekly schedule based on tasks in the database
@@ -58,71 +125,71 @@ def generate_weekly_schedule():
         Blueprint.query.delete()
         
         # Create blueprints for each day of the week
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
         day_blueprints = {}
         
-        for day in days:
+        for day in ALL_DAYS:
             blueprint = Blueprint()
             blueprint.name = f"{day} Schedule"
             blueprint.description = f"Auto-generated schedule for {day}"
             blueprint.day_of_week = day
             blueprint.is_active = True
-            db.session.add(blueprint)
-            db.session.flush()  # Get ID without committing
             day_blueprints[day] = blueprint
         
-        # Get all tasks that are not completed
-        active_tasks = Task.query.filter_by(completed=False).all()
+        db.session.add_all(day_blueprints.values())
+        db.session.flush()  # Get IDs without committing
+        
+        # Get all tasks that are not completed, with their category, in one query,
+        # sorted by priority (1=High, 2=Medium, 3=Low) then deadline
+        active_tasks = db.session.query(
+            Task.id, Task.title, Task.priority, Task.deadline, Task.goal_id,
+            Category.id, Category.name
+        ).join(
+            Goal, Task.goal_id == Goal.id
+        ).join(
+            Category, Goal.category_id == Category.id
+        ).filter(
+            Task.completed == False
+        ).order_by(
+            Task.priority, Task.deadline.asc().nullslast(), Task.id
+        ).all()
         
-        # Group tasks by category
+        # Group tasks by category, keeping the query order within each category
         tasks_by_category = {}
-        for task in active_tasks:
-            # Get category for this task
-            goal = Goal.query.get(task.goal_id)
-            if not goal:
-                continue
-                
-            category = Category.query.get(goal.category_id)
-            if not category:
-                continue
-                
-            if category.name not in tasks_by_category:
-                tasks_by_category[category.name] = []
+        for task_id, title, priority, deadline, goal_id, category_id, category_name in active_tasks:
+            if category_name not in tasks_by_category:
+                tasks_by_category[category_name] = []
                 
-            tasks_by_category[category.name].append({
-                "id": task.id,
-                "title": task.title,
-                "priority": task.priority,
-                "deadline": task.deadline,
-                "goal_id": task.goal_id,
-                "category": category.name,
-                "category_id": category.id
+            tasks_by_category[category_name].append({
+                "id": task_id,
+                "title": title,
+                "priority": priority,
+                "deadline": deadline,
+                "goal_id": goal_id,
+                "category": category_name,
+                "category_id": category_id
             })
         
-        # Sort tasks by priority (1=High, 2=Medium, 3=Low)
+        # Distribute tasks to the days they are eligible for in a single pass
+        tomorrow = datetime.utcnow().date() + timedelta(days=1)
+        day_tasks_by_day = {day: [] for day in ALL_DAYS}
         for category, tasks in tasks_by_category.items():
-            tasks.sort(key=lambda x: (x["priority"], x["deadline"] if x["deadline"] else datetime.max))
+            for task in tasks:
+                for day in get_eligible_days(task, tomorrow):
+                    day_tasks_by_day[day].append(task)
         
         # Schedule tasks for each day
         schedule = {}
-        for day in days:
-            schedule[day] = []
-            
-            # Get eligible tasks for this day
-            day_tasks = []
-            for category, tasks in tasks_by_category.items():
-                for task in tasks:
-                    if is_task_eligible_for_day(task, day):
-                        day_tasks.append(task)
-            
+        for day in ALL_DAYS:
             # Balance tasks according to CATEGORY_BALANCE
-            balanced_tasks = balance_day_tasks(day_tasks)
+            balanced_tasks = balance_day_tasks(day_tasks_by_day[day])
             
             # Allocate time slots
             schedule[day] = allocate_time_slots(balanced_tasks, day_blueprints[day])
         
-        # Commit changes to database
+        # Save every allocated slot and commit the rebuild as one transaction
+        db.session.add_all([time_slot for slots in schedule.values() for time_slot in slots])
         db.session.commit()
+        invalidate_schedule_cache()
         
         logger.info("Successfully generated weekly schedule")
         return True
@@ -132,40 +199,39 @@ def generate_weekly_schedule():
         logger.error(f"Error generating weekly schedule: {str(e)}")
         return False
 
-def is_task_eligible_for_day(task, day):
+def get_eligible_days(task, tomorrow):
+    """
+    Get the days of the week a task may be scheduled on
+    
+    Args:
+        task: Dictionary with task information
+        tomorrow: Tomorrow's date, computed once by the caller
+        
+    Returns:
+        Collection of day names (e.g., "Monday")
+    """
+    # If today or tomorrow is the deadline, the task is eligible every day
+    if task["deadline"] and task["deadline"].date() <= tomorrow:
+        return ALL_DAYS
+    
+    # Otherwise use the category's preferred days, defaulting to all days
+    return DAY_PREFERENCES.get(task["category"], ALL_DAYS)
+
+def is_task_eligible_for_day(task, day, tomorrow=None):
     """
     Check if a task should be scheduled on a particular day
     
     Args:
         task: Dictionary with task information
         day: Day of the week (e.g., "Monday")
+        tomorrow: Tomorrow's date; pass it in when checking many tasks
         
     Returns:
         Boolean indicating eligibility
     """
-    # Check deadline
-    if task["deadline"]:
-        # If today or tomorrow is the deadline, task is eligible for today
-        now = datetime.utcnow()
-        today = now.date()
-        tomorrow = today + timedelta(days=1)
-        
-        if task["deadline"].date() <= tomorrow:
-            return True
-    
-    # Check preferred days (based on category pattern)
-    day_preferences = {
-        "Class 11": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
-        "AI Tools": ["Monday", "Wednesday", "Friday"],
-        "Freelancing": ["Tuesday", "Thursday", "Saturday"],
-        "Certifications": ["Monday", "Wednesday", "Friday"],
-        "Career Planning": ["Saturday", "Sunday"]
-    }
-    
-    # Default to all days if category not found
-    all_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    
-    return day in day_preferences.get(task["category"], all_days)
+    if tomorrow is None:
+        tomorrow = datetime.utcnow().date() + timedelta(days=1)
+    return day in get_eligible_days(task, tomorrow)
 
 def balance_day_tasks(day_tasks):
     """
@@ -177,12 +243,13 @@ def balance_day_tasks(day_tasks):
     Returns:
         List of balanced tasks
     """
-    # Group by category
-    by_category = {}
+    # Bucket tasks by (category, priority) in one pass, remembering the
+    # order in which categories first appear
+    categories = {}
+    buckets = {}
     for task in day_tasks:
-        if task["category"] not in by_category:
-            by_category[task["category"]] = []
-        by_category[task["category"]].append(task)
+        categories.setdefault(task["category"], None)
+        buckets.setdefault((task["category"], task["priority"]), []).append(task)
     
     # Calculate max tasks to include per category (based on CATEGORY_BALANCE)
     total_tasks = min(len(day_tasks), 8)  # Cap at 8 tasks per day
@@ -191,34 +258,18 @@ def balance_day_tasks(day_tasks):
     for category, percentage in CATEGORY_BALANCE.items():
         category_limits[category] = max(1, int(total_tasks * percentage / 100))
     
-    # Select tasks respecting limits
+    # Select tasks respecting limits: high priority first (allowing one task
+    # for categories without a configured balance), then medium, then low
     balanced_tasks = []
     
-    # First, add high priority tasks
-    for category, tasks in by_category.items():
-        high_priority = [t for t in tasks if t["priority"] == 1]
-        for task in high_priority[:category_limits.get(category, 1)]:
-            balanced_tasks.append(task)
+    for priority, default_limit in ((1, 1), (2, 0), (3, 0)):
+        for category in categories:
+            selected = buckets.get((category, priority), [])[:category_limits.get(category, default_limit)]
+            balanced_tasks.extend(selected)
             
             # Decrement limit for this category
             if category in category_limits:
-                category_limits[category] -= 1
-    
-    # Then add medium priority tasks
-    for category, tasks in by_category.items():
-        medium_priority = [t for t in tasks if t["priority"] == 2]
-        for task in medium_priority[:category_limits.get(category, 0)]:
-            balanced_tasks.append(task)
-            
-            # Decrement limit for this category
-            if category in category_limits:
-                category_limits[category] -= 1
-    
-    # Finally add low priority tasks
-    for category, tasks in by_category.items():
-        low_priority = [t for t in tasks if t["priority"] == 3]
-        for task in low_priority[:category_limits.get(category, 0)]:
-            balanced_tasks.append(task)
+                category_limits[category] -= len(selected)
     
     return balanced_tasks
 
@@ -231,76 +282,43 @@ def allocate_time_slots(tasks, blueprint):
         blueprint: Blueprint object for the day
         
     Returns:
-        List of allocated time slots
+        List of allocated TimeSlot objects, not yet added to the session
     """
-    # Create a list of available slots
-    available_slots = MORNING_SLOTS + AFTERNOON_SLOTS + EVENING_SLOTS
-    
-    # Assign time slots based on task category preferences
-    category_time_preferences = {
-        "Class 11": MORNING_SLOTS,
-        "AI Tools": MORNING_SLOTS + AFTERNOON_SLOTS,
-        "Freelancing": AFTERNOON_SLOTS + EVENING_SLOTS,
-        "Certifications": AFTERNOON_SLOTS,
-        "Career Planning": EVENING_SLOTS
-    }
-    
     # Sort tasks by priority
     tasks.sort(key=lambda x: x["priority"])
     
-    # Track allocated slots
+    # Track free slots as a bitmask of slot indices
     allocated_slots = []
-    used_slots = set()
+    free_mask = (1 << len(ALL_SLOTS)) - 1
     
     for task in tasks:
-        # Get preferred slots for this category
-        preferred_slots = category_time_preferences.get(task["category"], available_slots)
-        
-        # Find an available slot
-        allocated = False
-        for slot in preferred_slots:
-            # Skip if slot is already used
-            slot_id = f"{slot['start']}-{slot['end']}"
-            if slot_id in used_slots:
-                continue
-            
-            # Create time slot
-            time_slot = TimeSlot()
-            time_slot.blueprint_id = blueprint.id
-            time_slot.category_id = task["category_id"]
-            time_slot.title = task["title"]
-            time_slot.description = f"Auto-scheduled task"
-            time_slot.start_time = datetime.strptime(slot["start"], "%H:%M").time()
-            time_slot.end_time = datetime.strptime(slot["end"], "%H:%M").time()
-            time_slot.goal_id = task["goal_id"]
-            
-            db.session.add(time_slot)
-            allocated_slots.append(time_slot)
-            used_slots.add(slot_id)
-            allocated = True
+        if not free_mask:
+            # Every slot is taken
             break
         
-        if not allocated:
-            # If no preferred slot is available, try any slot
-            for slot in available_slots:
-                slot_id = f"{slot['start']}-{slot['end']}"
-                if slot_id in used_slots:
-                    continue
-                
-                # Create time slot
-                time_slot = TimeSlot()
-                time_slot.blueprint_id = blueprint.id
-                time_slot.category_id = task["category_id"]
-                time_slot.title = task["title"]
-                time_slot.description = f"Auto-scheduled task"
-                time_slot.start_time = datetime.strptime(slot["start"], "%H:%M").time()
-                time_slot.end_time = datetime.strptime(slot["end"], "%H:%M").time()
-                time_slot.goal_id = task["goal_id"]
-                
-                db.session.add(time_slot)
-                allocated_slots.append(time_slot)
-                used_slots.add(slot_id)
-                break
+        # Find an available slot among the preferred slots for this category
+        preferred_slots = CATEGORY_SLOT_PREFERENCES.get(task["category"], ALL_SLOT_INDICES)
+        index = next((i for i in preferred_slots if free_mask & (1 << i)), None)
+        
+        if index is None:
+            # If no preferred slot is available, take the earliest free slot
+            index = (free_mask & -free_mask).bit_length() - 1
+        
+        free_mask &= ~(1 << index)
+        start_time, end_time = ALL_SLOTS[index]
+        
+        # Create time slot
+        time_slot = TimeSlot()
+        time_slot.blueprint_id = blueprint.id
+        time_slot.category_id = task["category_id"]
+        time_slot.title = task["title"]
+        time_slot.description = f"Auto-scheduled task"
+        time_slot.start_time = start_time
+        time_slot.end_time = end_time
+        time_slot.goal_id = task["goal_id"]
+        time_slot.task_id = task["id"]
+        
+        allocated_slots.append(time_slot)
     
     return allocated_slots
 
@@ -318,6 +336,9 @@ def get_daily_schedule(day=None):
         # Get current day of week
         day = datetime.utcnow().strftime("%A")
     
+    # Apply any deferred regeneration before reading
+    regenerate_if_dirty()
+    
     # Find blueprint for this day
     blueprint = Blueprint.query.filter_by(day_of_week=day).first()
     
@@ -328,14 +349,15 @@ def get_daily_schedule(day=None):
             "time_slots": []
         }
     
-    # Get time slots for this blueprint
-    time_slots = TimeSlot.query.filter_by(blueprint_id=blueprint.id).all()
+    # Get time slots for this blueprint with their categories, sorted by start time
+    time_slots = db.session.query(TimeSlot, Category).outerjoin(
+        Category, TimeSlot.category_id == Category.id
+    ).filter(
+        TimeSlot.blueprint_id == blueprint.id
+    ).order_by(TimeSlot.start_time, TimeSlot.id).all()
     
     formatted_slots = []
-    for slot in time_slots:
-        # Get category
-        category = Category.query.get(slot.category_id)
-        
+    for slot, category in time_slots:
         # Format times
         start_time = slot.start_time.strftime("%H:%M")
         end_time = slot.end_time.strftime("%H:%M")
@@ -351,9 +373,6 @@ def get_daily_schedule(day=None):
             "goal_id": slot.goal_id
         })
     
-    # Sort by start time
-    formatted_slots.sort(key=lambda x: x["start_time"])
-    
     return {
         "day": day,
         "has_schedule": True,
@@ -368,8 +387,33 @@ def regenerate_schedule():
     Returns:
         Boolean indicating success
     """
+    global _schedule_dirty
+    
+    # A full rebuild covers any pending deferred regeneration
+    with _schedule_dirty_lock:
+        _schedule_dirty = False
+    
     return generate_weekly_schedule()
 
+def get_slot_task(time_slot):
+    """
+    Get the task a time slot was scheduled for
+    
+    Args:
+        time_slot: TimeSlot object
+        
+    Returns:
+        Task object or None if the slot has no task
+    """
+    if time_slot.task_id is not None:
+        return Task.query.get(time_slot.task_id)
+    
+    # Slots created before task_id was recorded are matched by goal and title
+    return Task.query.filter_by(
+        goal_id=time_slot.goal_id,
+        title=time_slot.title
+    ).first()
+
 def mark_slot_complete(slot_id):
     """
     Mark a time slot's task as completed
@@ -387,16 +431,15 @@ def mark_slot_complete(slot_id):
             return False
         
         # Get the associated task (if any)
-        task = Task.query.filter_by(
-            goal_id=time_slot.goal_id,
-            title=time_slot.title
-        ).first()
+        task = get_slot_task(time_slot)
         
         if task:
             # Mark task as completed
             task.completed = True
             task.completion_date = datetime.utcnow()
             db.session.commit()
+            invalidate_progress_cache()
+            invalidate_priority_cache()
             
             logger.info(f"Marked task '{task.title}' as completed")
             
@@ -435,9 +478,11 @@ def handle_missed_task(task_id):
             logger.info(f"Rescheduled missed task: {task.title}")
             
             db.session.commit()
+            invalidate_progress_cache()
+            invalidate_priority_cache()
         
-        # Regenerate schedule to fit the task
-        regenerate_schedule()
+        # Regenerate schedule to fit the task on the next read
+        mark_schedule_dirty()
         
         return True
     
@@ -463,10 +508,7 @@ def snooze_task(slot_id):
             return False
         
         # Get the task
-        task = Task.query.filter_by(
-            goal_id=time_slot.goal_id,
-            title=time_slot.title
-        ).first()
+        task = get_slot_task(time_slot)
         
         if task:
             # Push deadline one day if it's today or earlier
@@ -477,13 +519,16 @@ def snooze_task(slot_id):
                 tomorrow = today + timedelta(days=1)
                 task.deadline = datetime.combine(tomorrow, time(hour=17, minute=0))
                 db.session.commit()
+                invalidate_progress_cache()
+                invalidate_priority_cache()
         
         # Delete the time slot
         db.session.delete(time_slot)
         db.session.commit()
+        invalidate_schedule_cache()
         
-        # Regenerate schedule
-        regenerate_schedule()
+        # Regenerate schedule on the next read
+        mark_schedule_dirty()
         
         return True
     
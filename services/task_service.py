@@ -3,14 +3,52 @@ Task service for the Mentora application
 Handles business logic for task management
 """
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from sqlalchemy import exists
 from app import db
-from models import Task, Goal
-from utils.priority_engine import get_daily_priorities
+from models import Task, Goal, Reminder, TimeSlot
+from services.blueprint_service import invalidate_schedule_cache
+from services.progress_service import invalidate_progress_cache
+from utils.data_validator import parse_iso_datetime
+from utils.priority_engine import get_daily_priorities, invalidate_priority_cache
 from utils.reminder_scheduler import create_default_reminders
 
 logger = logging.getLogger(__name__)
 
+def _parse_deadline(deadline):
+    """
+    Convert a deadline to a naive UTC datetime
+    
+    The database stores deadlines as naive UTC, so aware values are
+    converted to UTC before the offset is dropped, keeping in-memory values
+    comparable with utcnow() and with the values loaded back from the database.
+    
+    Args:
+        deadline: ISO format string, datetime or None
+    
+    Returns:
+        Naive datetime, or None
+    """
+    if isinstance(deadline, str):
+        deadline = parse_iso_datetime(deadline)
+    
+    if deadline is not None and deadline.tzinfo is not None:
+        deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return deadline
+
+def _goal_exists(goal_id):
+    """
+    Check whether a goal exists without loading it
+    
+    Args:
+        goal_id: ID of the goal
+    
+    Returns:
+        True if the goal exists, False otherwise
+    """
+    return db.session.query(exists().where(Goal.id == goal_id)).scalar()
+
 def get_all_tasks(completed=None):
     """
     Get all tasks with optional filtering
@@ -77,14 +115,12 @@ def create_task(title, goal_id, description=None, deadline=None, priority=2,
         Newly created Task object
     """
     # Ensure goal exists
-    goal = Goal.query.get(goal_id)
-    if not goal:
+    if not _goal_exists(goal_id):
         logger.error(f"Cannot create task: Goal {goal_id} not found")
         return None
     
     # Convert string date to datetime if necessary
-    if isinstance(deadline, str):
-        deadline = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
+    deadline = _parse_deadline(deadline)
     
     # Create task
     task = Task(
@@ -99,14 +135,18 @@ def create_task(title, goal_id, description=None, deadline=None, priority=2,
     )
     
     db.session.add(task)
-    db.session.commit()
     
-    logger.info(f"Created new task: {task.id} - {task.title}")
-    
-    # Create default reminders if deadline is set
+    # Create default reminders if deadline is set, in the same transaction
     if deadline:
+        db.session.flush()
         create_default_reminders(task)
     
+    db.session.commit()
+    invalidate_progress_cache()
+    invalidate_priority_cache()
+    
+    logger.info(f"Created new task: {task.id} - {task.title}")
+    
     return task
 
 def update_task(task_id, title=None, description=None, goal_id=None,
@@ -145,22 +185,20 @@ def update_task(task_id, title=None, description=None, goal_id=None,
     
     if goal_id is not None:
         # Ensure goal exists
-        if Goal.query.get(goal_id):
+        if _goal_exists(goal_id):
             task.goal_id = goal_id
         else:
             logger.warning(f"Cannot update task: Goal {goal_id} not found")
     
     old_deadline = task.deadline
     if deadline is not None:
-        if isinstance(deadline, str):
-            deadline = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
+        deadline = _parse_deadline(deadline)
         task.deadline = deadline
         
         # If deadline changed, update reminders
         if deadline != old_deadline:
-            # Delete existing reminders
-            for reminder in task.reminders:
-                db.session.delete(reminder)
+            # Delete existing reminders in a single statement
+            Reminder.query.filter_by(task_id=task.id).delete(synchronize_session=False)
             
             # Create new reminders
             if deadline:
@@ -194,9 +232,12 @@ def update_task(task_id, title=None, description=None, goal_id=None,
     
     task.updated_at = datetime.utcnow()
     
-    db.session.add(task)
+    # Task changes and any new reminders are saved together
     db.session.commit()
     
+    invalidate_progress_cache()
+    invalidate_priority_cache()
+    
     logger.info(f"Updated task: {task.id}")
     return task
 
@@ -210,15 +251,27 @@ def delete_task(task_id):
     Returns:
         True if successful, False if task not found
     """
-    task = Task.query.get(task_id)
+    # Delete by primary key without loading the task. The ORM cascade to
+    # reminders and the unlinking of subtasks and scheduled time slots are
+    # done here in bulk.
+    Reminder.query.filter_by(task_id=task_id).delete(synchronize_session=False)
+    Task.query.filter_by(parent_task_id=task_id).update(
+        {Task.parent_task_id: None}, synchronize_session=False
+    )
+    TimeSlot.query.filter_by(task_id=task_id).update(
+        {TimeSlot.task_id: None}, synchronize_session=False
+    )
+    deleted = Task.query.filter_by(id=task_id).delete()
     
-    if not task:
+    if not deleted:
+        db.session.rollback()
         logger.warning(f"Attempted to delete non-existent task with ID: {task_id}")
         return False
     
-    # Task deletion will cascade to reminders due to relationship setup
-    db.session.delete(task)
     db.session.commit()
+    invalidate_progress_cache()
+    invalidate_priority_cache()
+    invalidate_schedule_cache()
     
     logger.info(f"Deleted task: {task_id}")
     return True
@@ -0,0 +1,84 @@
+"""
+Caching utilities for the Mentora application
+Provides a small process-local TTL cache for expensive read-only service calls
+"""
+import threading
+from functools import wraps
+from time import monotonic
+
+
+def ttl_cache(ttl):
+    """
+    Decorator caching a function's results for a number of seconds
+    
+    Results are keyed by the call arguments, which must be hashable.
+    Concurrent misses for the same key are coalesced: one caller computes
+    the result while the others wait for it. The wrapped function gains a
+    cache_clear() method for invalidation; results computed while
+    cache_clear() runs are not stored.
+    
+    Args:
+        ttl: Time to live for cached results, in seconds
+    
+    Returns:
+        Decorator function
+    """
+    def decorator(f):
+        cache = {}
+        lock = threading.Lock()
+        # Bumped by cache_clear() so in-flight results are not stored
+        generation = [0]
+        # Per-key locks held while a result is being computed
+        key_locks = {}
+        
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            
+            with lock:
+                entry = cache.get(key)
+            
+            if entry and entry[0] > monotonic():
+                return entry[1]
+            
+            with lock:
+                key_lock = key_locks.setdefault(key, threading.Lock())
+            
+            with key_lock:
+                now = monotonic()
+                
+                # Another caller may have stored the result while we waited
+                with lock:
+                    entry = cache.get(key)
+                    start_generation = generation[0]
+                
+                if entry and entry[0] > now:
+                    return entry[1]
+                
+                try:
+                    result = f(*args, **kwargs)
+                except BaseException:
+                    with lock:
+                        key_locks.pop(key, None)
+                    raise
+                
+                # Store the result before releasing the key lock so callers
+                # arriving in between find it instead of recomputing
+                with lock:
+                    if generation[0] == start_generation:
+                        # Drop expired entries so the cache does not grow unbounded
+                        for expired_key in [k for k, (expires_at, _) in cache.items() if expires_at <= now]:
+                            del cache[expired_key]
+                        cache[key] = (now + ttl, result)
+                    key_locks.pop(key, None)
+            
+            return result
+        
+        def cache_clear():
+            with lock:
+                generation[0] += 1
+                cache.clear()
+        
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
@@ -3,10 +3,26 @@ Data validation utilities for the Mentora application
 """
 import re
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, wraps
 from flask import request, jsonify
 from config import PRIORITY_LEVELS, RECURRENCE_TYPES
 
+# Patterns used by the schemas, compiled once at import.
+# Values must match a pattern in full (see validate_field).
+HEX_COLOR_PATTERN = re.compile(r'#[0-9A-Fa-f]{6}')
+TIME_HHMM_PATTERN = re.compile(r'([01]?[0-9]|2[0-3]):[0-5][0-9]')
+
+
+@lru_cache(maxsize=256)
+def parse_iso_datetime(value):
+    """
+    Parse an ISO format date string, accepting a trailing 'Z' for UTC
+    
+    Results are cached, so a value checked by the validator is not parsed
+    again when the service converts it.
+    """
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
 
 def validate_request(schema):
     """
@@ -29,17 +45,33 @@ def validate_request(schema):
     return decorator
 
 
-def validate_data(data, schema):
+def _required_fields(schema):
+    """
+    Get the set of required fields of a schema
+    Module-level schemas are looked up in _REQUIRED_FIELDS
+    """
+    required_fields = _REQUIRED_FIELDS.get(id(schema))
+    if required_fields is None:
+        required_fields = frozenset(
+            field for field, rules in schema.items() if rules.get('required', False)
+        )
+    return required_fields
+
+
+def validate_data(data, schema, required=True):
     """
     Validate data against a schema definition
     Returns dict with valid (bool) and errors (list)
+    
+    When required is False, required fields are not enforced (for partial updates)
     """
     errors = []
     
-    # Check for required fields
-    for field, rules in schema.items():
-        if rules.get('required', False) and field not in data:
-            errors.append(f"Field '{field}' is required")
+    # Check for required fields, reporting missing ones in schema order
+    if required:
+        missing = _required_fields(schema) - data.keys()
+        if missing:
+            errors.extend(f"Field '{field}' is required" for field in schema if field in missing)
     
     # Validate field values
     for field, value in data.items():
@@ -64,16 +96,7 @@ def validate_blueprint_data(data, required=True):
     Returns:
         Dictionary with validation results
     """
-    # Create a copy of the schema
-    schema = blueprint_schema.copy()
-    
-    # Modify required fields based on the required parameter
-    if not required:
-        for field in schema:
-            schema[field] = schema[field].copy()
-            schema[field]['required'] = False
-    
-    return validate_data(data, schema)
+    return validate_data(data, blueprint_schema, required)
 
 
 def validate_time_slot_data(data, required=True):
@@ -87,16 +110,7 @@ def validate_time_slot_data(data, required=True):
     Returns:
         Dictionary with validation results
     """
-    # Create a copy of the schema
-    schema = time_slot_schema.copy()
-    
-    # Modify required fields based on the required parameter
-    if not required:
-        for field in schema:
-            schema[field] = schema[field].copy()
-            schema[field]['required'] = False
-    
-    return validate_data(data, schema)
+    return validate_data(data, time_slot_schema, required)
 
 
 def validate_field(field, value, rules):
@@ -106,44 +120,40 @@ def validate_field(field, value, rules):
     """
     errors = []
     
+    rule_type = rules.get('type')
+    
     # Check field type
-    if 'type' in rules:
-        type_error = validate_type(field, value, rules['type'])
+    if rule_type is not None:
+        type_error = validate_type(field, value, rule_type)
         if type_error:
             errors.append(type_error)
     
-    # Check min length for strings
-    if rules.get('type') == 'string' and 'min_length' in rules and len(value) < rules['min_length']:
-        errors.append(f"Field '{field}' must be at least {rules['min_length']} characters long")
-    
-    # Check max length for strings
-    if rules.get('type') == 'string' and 'max_length' in rules and len(value) > rules['max_length']:
-        errors.append(f"Field '{field}' cannot exceed {rules['max_length']} characters")
+    if rule_type == 'string':
+        # Check min length for strings
+        if 'min_length' in rules and len(value) < rules['min_length']:
+            errors.append(f"Field '{field}' must be at least {rules['min_length']} characters long")
+        
+        # Check max length for strings
+        if 'max_length' in rules and len(value) > rules['max_length']:
+            errors.append(f"Field '{field}' cannot exceed {rules['max_length']} characters")
+        
+        # Check pattern for strings
+        if 'pattern' in rules and not rules['pattern'].fullmatch(value):
+            errors.append(f"Field '{field}' does not match the required pattern")
     
-    # Check pattern for strings
-    if rules.get('type') == 'string' and 'pattern' in rules and not re.match(rules['pattern'], value):
-        errors.append(f"Field '{field}' does not match the required pattern")
-    
-    # Check min value for numbers
-    if rules.get('type') in ('integer', 'number') and 'min' in rules and value < rules['min']:
-        errors.append(f"Field '{field}' must be at least {rules['min']}")
-    
-    # Check max value for numbers
-    if rules.get('type') in ('integer', 'number') and 'max' in rules and value > rules['max']:
-        errors.append(f"Field '{field}' cannot exceed {rules['max']}")
+    elif rule_type in ('integer', 'number'):
+        # Check min value for numbers
+        if 'min' in rules and value < rules['min']:
+            errors.append(f"Field '{field}' must be at least {rules['min']}")
+        
+        # Check max value for numbers
+        if 'max' in rules and value > rules['max']:
+            errors.append(f"Field '{field}' cannot exceed {rules['max']}")
     
     # Check enum values
     if 'enum' in rules and value not in rules['enum']:
         errors.append(f"Field '{field}' must be one of: {', '.join(map(str, rules['enum']))}")
     
-    # Check date format
-    if rules.get('type') == 'date' and value:
-        try:
-            if isinstance(value, str):
-                datetime.fromisoformat(value.replace('Z', '+00:00'))
-        except ValueError:
-            errors.append(f"Field '{field}' must be a valid ISO date format")
-    
     # Custom validations
     if 'custom' in rules and callable(rules['custom']):
         custom_error = rules['custom'](value)
@@ -180,7 +190,7 @@ def validate_type(field, value, expected_type):
         # For dates, we accept string representations that can be parsed
         if isinstance(value, str):
             try:
-                datetime.fromisoformat(value.replace('Z', '+00:00'))
+                parse_iso_datetime(value)
             except ValueError:
                 return f"Field '{field}' must be a valid ISO date string"
         elif not isinstance(value, datetime):
@@ -203,7 +213,7 @@ category_schema = {
     },
     'color': {
         'type': 'string',
-        'pattern': r'^#[0-9A-Fa-f]{6}$'  # Hex color code
+        'pattern': HEX_COLOR_PATTERN  # Hex color code
     }
 }
 
@@ -321,12 +331,12 @@ time_slot_schema = {
     'start_time': {
         'type': 'string',
         'required': True,
-        'pattern': r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$'  # HH:MM format
+        'pattern': TIME_HHMM_PATTERN  # HH:MM format
     },
     'end_time': {
         'type': 'string',
         'required': True,
-        'pattern': r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$'  # HH:MM format
+        'pattern': TIME_HHMM_PATTERN  # HH:MM format
     },
     'goal_id': {
         'type': 'integer'
@@ -347,9 +357,16 @@ user_preference_schema = {
     },
     'daily_review_time': {
         'type': 'string',
-        'pattern': r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$'  # HH:MM format
+        'pattern': TIME_HHMM_PATTERN  # HH:MM format
     },
     'do_not_disturb': {
         'type': 'boolean'
     }
 }
+
+
+# Required fields of the module-level schemas, keyed by schema identity
+_REQUIRED_FIELDS = {}
+for _schema in (category_schema, goal_schema, task_schema, reminder_schema,
+                blueprint_schema, time_slot_schema, user_preference_schema):
+    _REQUIRED_FIELDS[id(_schema)] = _required_fields(_schema)
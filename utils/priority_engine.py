@@ -2,13 +2,46 @@
 Priority Engine for the Mentora application
 Implements a rule-based system for task prioritization
 """
+import heapq
 import logging
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from models import Task, Goal
+from sqlalchemy import func, case
+from sqlalchemy.orm import aliased, contains_eager, joinedload
+from models import Task, Goal, Category
+from utils.cache import ttl_cache
 
 logger = logging.getLogger(__name__)
 
-def calculate_task_priority(task):
+# How long the daily priority ranking is reused (in seconds)
+DAILY_PRIORITIES_TTL = 60
+
+# Category-based importance (could be expanded with user preferences)
+CATEGORY_SCORES = {
+    'Certifications': 40,
+    'Career Planning': 35,
+    'Freelancing': 30,
+    'AI Tools': 25,
+    'Study': 20
+}
+
+# Deadline urgency as (days until deadline is below, score) bands:
+# overdue, due today, due in 1-2 days, due this week, then 5 points
+# less for each following week. Deadlines further out score 0.
+DEADLINE_BANDS = (
+    (0, 200),
+    (1, 150),
+    (3, 100),
+    (8, 50),
+    (14, 25),
+    (21, 20),
+    (28, 15),
+    (35, 10),
+    (42, 5)
+)
+_DEADLINE_THRESHOLDS = [days for days, _ in DEADLINE_BANDS]
+
+def calculate_task_priority(task, goal_scores=None, now=None):
     """
     Calculate priority score for a task based on multiple factors:
     - Deadline proximity
@@ -17,6 +50,10 @@ def calculate_task_priority(task):
     - Completion status
     - User-defined priority
     
+    Goal importance is the same for every task of a goal, so callers
+    scoring many tasks can pass a goal_scores dict to memoize it by goal ID,
+    and a single now so every task is scored against the same time.
+    
     Returns a priority score (lower is higher priority)
     """
     if task.completed:
@@ -26,10 +63,15 @@ def calculate_task_priority(task):
     base_score = task.priority * 100
     
     # Factor 1: Deadline proximity
-    deadline_score = _calculate_deadline_score(task)
+    deadline_score = _calculate_deadline_score(task, now)
     
     # Factor 2: Goal importance (based on category)
-    goal_score = _calculate_goal_importance(task)
+    if goal_scores is None:
+        goal_score = _calculate_goal_importance(task)
+    else:
+        goal_score = goal_scores.get(task.goal_id)
+        if goal_score is None:
+            goal_score = goal_scores[task.goal_id] = _calculate_goal_importance(task)
     
     # Factor 3: Dependencies - tasks blocking others get higher priority
     dependency_score = _calculate_dependency_score(task)
@@ -41,45 +83,36 @@ def calculate_task_priority(task):
     
     return final_score
 
-def _calculate_deadline_score(task):
+def _calculate_deadline_score(task, now=None):
     """Calculate score based on deadline proximity"""
     if not task.deadline:
         return 0
     
-    now = datetime.utcnow()
+    if now is None:
+        now = datetime.utcnow()
     days_until_deadline = (task.deadline - now).days
     
-    if days_until_deadline < 0:  # Overdue
-        return 200  # High urgency
-    elif days_until_deadline == 0:  # Due today
-        return 150
-    elif days_until_deadline <= 2:  # Due in 1-2 days
-        return 100
-    elif days_until_deadline <= 7:  # Due this week
-        return 50
-    else:
-        return max(0, 30 - days_until_deadline // 7 * 5)  # Gradually decreases
+    band = bisect_right(_DEADLINE_THRESHOLDS, days_until_deadline)
+    if band == len(DEADLINE_BANDS):
+        return 0
+    return DEADLINE_BANDS[band][1]
 
 def _calculate_goal_importance(task):
     """Calculate score based on goal category and progress"""
     goal = task.goal
     
-    # Category-based importance (could be expanded with user preferences)
-    category_map = {
-        'Certifications': 40,
-        'Career Planning': 35,
-        'Freelancing': 30,
-        'AI Tools': 25,
-        'Study': 20
-    }
+    category_score = CATEGORY_SCORES.get(goal.category.name, 0)
     
-    category_score = category_map.get(goal.category.name, 0)
+    # Use progress preloaded by get_daily_priorities when available
+    progress = getattr(goal, '_progress', None)
+    if progress is None:
+        progress = goal.progress
     
     # Goals closer to completion get higher priority to encourage finishing
     progress_bonus = 0
-    if goal.progress >= 75:
+    if progress >= 75:
         progress_bonus = 30  # Almost complete
-    elif goal.progress >= 50:
+    elif progress >= 50:
         progress_bonus = 15  # Half complete
     
     return category_score + progress_bonus
@@ -87,47 +120,184 @@ def _calculate_goal_importance(task):
 def _calculate_dependency_score(task):
     """Calculate score based on task dependencies"""
     # Tasks that are blocking other tasks get higher priority
-    dependency_count = task.subtasks.count()
+    dependency_count = getattr(task, '_subtask_count', None)
+    if dependency_count is None:
+        dependency_count = task.subtasks.count()
     return dependency_count * 20  # Each dependent task adds 20 points of priority
 
-def prioritize_tasks(tasks):
+def prioritize_tasks(tasks, limit=None):
     """
     Sort tasks by calculated priority
-    Returns a list of tasks sorted by priority (highest first)
+    Returns a list of tasks sorted by priority (highest first),
+    only the top limit tasks if a limit is given
     """
-    task_priorities = [(task, calculate_task_priority(task)) for task in tasks]
+    # Goal importance is computed once per goal, and all tasks are
+    # scored against the same time
+    goal_scores = {}
+    now = datetime.utcnow()
+    task_priorities = [(task, calculate_task_priority(task, goal_scores, now)) for task in tasks]
+    
+    if limit is not None:
+        # Partial selection; same result as sorting and slicing
+        top_priorities = heapq.nsmallest(limit, task_priorities, key=lambda x: x[1])
+        return [task for task, _ in top_priorities]
+    
     sorted_tasks = [task for task, _ in sorted(task_priorities, key=lambda x: x[1])]
     return sorted_tasks
 
-def get_daily_priorities(limit=10):
+def _priority_score_expression(now, subtask_count, goal_total, goal_completed):
     """
-    Get prioritized tasks for today
-    Returns top priority tasks for the day
+    Build a SQL expression equivalent to calculate_task_priority
+    
+    Args:
+        now: Reference time for deadline proximity
+        subtask_count: Column with the number of subtasks of the task
+        goal_total: Column with the number of tasks in the task's goal
+        goal_completed: Column with the number of completed tasks in the goal
+    
+    Returns:
+        SQL expression for the priority score (lower is higher priority)
+    """
+    # Same bands as _calculate_deadline_score, where
+    # days_until_deadline < n is the same as deadline < now + n days
+    deadline_score = case(
+        (Task.deadline == None, 0),
+        *[
+            (Task.deadline < now + timedelta(days=days), score)
+            for days, score in DEADLINE_BANDS
+        ],
+        else_=0
+    )
+    
+    category_score = case(CATEGORY_SCORES, value=Category.name, else_=0)
+    
+    # Integer form of the goal progress thresholds
+    progress_bonus = case(
+        (goal_completed * 100 >= goal_total * 75, 30),
+        (goal_completed * 100 >= goal_total * 50, 15),
+        else_=0
+    )
+    
+    return (
+        Task.priority * 100
+        - deadline_score
+        - category_score
+        - progress_bonus
+        - subtask_count * 20
+    )
+
+def _query_prioritized_tasks(db, criteria, now, tiebreak=(), limit=None):
+    """
+    Load tasks matching the criteria ordered by priority score
+    
+    Scoring and the limit are applied by the database. Goals and
+    categories are loaded by the same query, and the subtask counts and
+    goal progress it computes are stashed on the instances so that
+    calculate_task_priority does not query per task.
+    
+    Args:
+        db: SQLAlchemy database instance
+        criteria: Filter criterion for the task query
+        now: Reference time for deadline proximity
+        tiebreak: Ordering for tasks with equal scores
+        limit: Maximum number of tasks to return, or None for all
+    
+    Returns:
+        List of Task objects sorted by priority (highest first)
+    """
+    subtask = aliased(Task)
+    subtask_counts = db.session.query(
+        subtask.parent_task_id.label('task_id'),
+        func.count(subtask.id).label('count')
+    ).group_by(subtask.parent_task_id).subquery()
+    
+    goal_task = aliased(Task)
+    goal_stats = db.session.query(
+        goal_task.goal_id.label('goal_id'),
+        func.count(goal_task.id).label('total'),
+        func.sum(case((goal_task.completed == True, 1), else_=0)).label('completed')
+    ).group_by(goal_task.goal_id).subquery()
+    
+    subtask_count = func.coalesce(subtask_counts.c.count, 0)
+    goal_completed = func.coalesce(goal_stats.c.completed, 0)
+    score = _priority_score_expression(now, subtask_count, goal_stats.c.total, goal_completed)
+    
+    rows = db.session.query(
+        Task, subtask_count, goal_stats.c.total, goal_completed
+    ).join(Task.goal).join(Goal.category).options(
+        contains_eager(Task.goal).contains_eager(Goal.category)
+    ).outerjoin(
+        subtask_counts, subtask_counts.c.task_id == Task.id
+    ).outerjoin(
+        goal_stats, goal_stats.c.goal_id == Task.goal_id
+    ).filter(criteria).order_by(score, *tiebreak).limit(limit).all()
+    
+    tasks = []
+    for task, task_subtask_count, goal_total, goal_completed_count in rows:
+        task._subtask_count = task_subtask_count
+        task.goal._progress = int((goal_completed_count / goal_total) * 100)
+        tasks.append(task)
+    
+    return tasks
+
+@ttl_cache(DAILY_PRIORITIES_TTL)
+def _get_daily_priority_ids(limit):
+    """
+    Rank today's candidate tasks and return the IDs of the top ones
+    
+    The candidate filter is backed by the ix_task_completed_deadline and
+    ix_task_completed_priority indexes on Task.
     """
     from app import db
     
     # Get incomplete tasks
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    now = datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
     tomorrow = today + timedelta(days=1)
     
-    # Tasks due today or overdue
-    due_today_or_overdue = db.session.query(Task).filter(
-        (Task.deadline < tomorrow) & 
-        (Task.completed == False)
-    ).all()
-    
-    # Add other important tasks (might not have deadlines but are high priority)
-    high_priority = db.session.query(Task).filter(
-        (Task.priority == 1) &
+    # Tasks due today or overdue, plus other important tasks (might not
+    # have deadlines but are high priority), scored and limited in SQL
+    due_today_or_overdue = Task.deadline < tomorrow
+    tasks = _query_prioritized_tasks(
+        db,
         (Task.completed == False) &
-        ((Task.deadline == None) | (Task.deadline >= tomorrow))
-    ).all()
+        (due_today_or_overdue | (Task.priority == 1)),
+        now,
+        # Due tasks first, then by id, for tasks with equal scores
+        tiebreak=(case((due_today_or_overdue, 0), else_=1), Task.id),
+        limit=limit
+    )
+    return [task.id for task in tasks]
+
+def get_daily_priorities(limit=10):
+    """
+    Get prioritized tasks for today
+    Returns top priority tasks for the day
+    
+    The ranking is cached for DAILY_PRIORITIES_TTL seconds; call
+    invalidate_priority_cache() after changing tasks or goals.
+    """
+    from app import db
+    
+    task_ids = _get_daily_priority_ids(limit)
+    if not task_ids:
+        return []
+    
+    tasks = db.session.query(Task).options(
+        joinedload(Task.goal).joinedload(Goal.category)
+    ).filter(Task.id.in_(task_ids)).all()
     
-    # Combine and prioritize
-    all_candidate_tasks = due_today_or_overdue + high_priority
-    prioritized_tasks = prioritize_tasks(all_candidate_tasks)
+    # Keep the ranked order, skipping tasks deleted since ranking
+    tasks_by_id = {task.id: task for task in tasks}
+    return [tasks_by_id[task_id] for task_id in task_ids if task_id in tasks_by_id]
+
+def invalidate_priority_cache():
+    """
+    Invalidate cached daily priorities
     
-    return prioritized_tasks[:limit]
+    Must be called whenever tasks or goals change.
+    """
+    _get_daily_priority_ids.cache_clear()
 
 def suggest_next_task():
     """
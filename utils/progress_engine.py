@@ -3,15 +3,40 @@ Progress Engine for Mentora application
 Analyzes user progress patterns and provides intelligent insights
 """
 import logging
-from datetime import datetime, timedelta
+from collections import defaultdict, deque
+from datetime import date as date_type, datetime, timedelta
+from operator import itemgetter
+from time import monotonic
+
+from sqlalchemy import func, case, or_
 
 from app import db
 from models import Task, Goal, Category, TimeSlot
+from utils.cache import ttl_cache
 
 logger = logging.getLogger(__name__)
 
-# Progress log cache
-daily_progress_logs = []
+# First and last instants of a day, for building day boundaries
+_DAY_START_TIME = datetime.min.time()
+_DAY_END_TIME = datetime.max.time()
+
+# Number of daily progress entries kept in memory
+PROGRESS_LOG_MAX_ENTRIES = 365
+
+# Progress log cache, oldest entries are dropped once full
+daily_progress_logs = deque(maxlen=PROGRESS_LOG_MAX_ENTRIES)
+
+# Number of days of completion history fetched per streak query
+STREAK_WINDOW_DAYS = 365
+
+# How long a computed streak is reused (in seconds)
+STREAK_CACHE_TTL = 60
+
+# Cached streak as (date, expires_at, streak)
+_streak_cache = None
+
+# How long metrics for a date are reused (in seconds)
+DAILY_METRICS_TTL = 60
 
 def log_daily_progress():
     """
@@ -19,6 +44,9 @@ def log_daily_progress():
     This is called automatically at the end of each day
     """
     today = datetime.utcnow().date()
+    
+    # Log fresh numbers rather than a cached result
+    invalidate_daily_metrics_cache()
     metrics = get_daily_metrics(today)
     
     # Add to progress logs
@@ -43,66 +71,38 @@ def get_daily_metrics(date=None):
     if date is None:
         date = datetime.utcnow().date()
     
-    day_start = datetime.combine(date, datetime.min.time())
-    day_end = datetime.combine(date, datetime.max.time())
-    
-    # Get task metrics
-    total_tasks = Task.query.filter(
-        Task.deadline.between(day_start, day_end)
-    ).count()
+    return _compute_daily_metrics(date)
+
+@ttl_cache(DAILY_METRICS_TTL)
+def _compute_daily_metrics(date):
+    """
+    Compute metrics for a specific day
     
-    completed_tasks = Task.query.filter(
-        Task.deadline.between(day_start, day_end),
-        Task.completed == True
-    ).count()
+    Results are cached per date for DAILY_METRICS_TTL seconds; call
+    invalidate_daily_metrics_cache() after changing tasks or goals.
+    """
+    day_start = datetime.combine(date, _DAY_START_TIME)
+    day_end = datetime.combine(date, _DAY_END_TIME)
     
-    completed_today = Task.query.filter(
-        Task.completion_date.between(day_start, day_end)
-    ).count()
+    # Get task metrics in a single aggregate query
+    total_tasks, completed_tasks, completed_today, overdue_tasks = _get_task_counts(date)
     
     # Get goal metrics
-    active_goals = Goal.query.filter_by(completed=False).count()
-    completed_goals = Goal.query.filter(
-        Goal.updated_at.between(day_start, day_end),
-        Goal.completed == True
-    ).count()
-    
-    # Calculate time spent (based on time slots)
-    time_spent = 0
-    time_slots = TimeSlot.query.all()
-    for slot in time_slots:
-        # Convert time objects to datetime for calculation
-        start = datetime.combine(date, slot.start_time)
-        end = datetime.combine(date, slot.end_time)
-        duration = (end - start).seconds / 3600  # in hours
-        time_spent += duration
+    active_goals, completed_goals = db.session.query(
+        func.sum(case((Goal.completed == False, 1), else_=0)),
+        func.sum(case(((Goal.updated_at.between(day_start, day_end)) & (Goal.completed == True), 1), else_=0))
+    ).one()
+    active_goals = active_goals or 0
+    completed_goals = completed_goals or 0
     
     # Calculate completion rate
     completion_rate = 0
     if total_tasks > 0:
         completion_rate = (completed_tasks / total_tasks) * 100
     
-    # Get time spent by category
-    time_by_category = {}
-    categories = Category.query.all()
-    
-    for category in categories:
-        category_slots = TimeSlot.query.filter_by(category_id=category.id).all()
-        category_time = 0
-        
-        for slot in category_slots:
-            start = datetime.combine(date, slot.start_time)
-            end = datetime.combine(date, slot.end_time)
-            duration = (end - start).seconds / 3600  # in hours
-            category_time += duration
-        
-        time_by_category[category.name] = category_time
-    
-    # Gather overdue tasks
-    overdue_tasks = Task.query.filter(
-        Task.deadline < day_start,
-        Task.completed == False
-    ).count()
+    # Get time spent by category (based on time slots) with one grouped query
+    time_by_category = get_time_by_category()
+    time_spent = sum(time_by_category.values())
     
     # Create metrics dictionary
     metrics = {
@@ -120,6 +120,167 @@ def get_daily_metrics(date=None):
     
     return metrics
 
+def _get_task_counts(date):
+    """
+    Get the task counters for a day with a single aggregate query
+    
+    Args:
+        date: The date to count tasks for
+    
+    Returns:
+        Tuple of (total_tasks, completed_tasks, completed_today, overdue_tasks)
+    """
+    day_start = datetime.combine(date, _DAY_START_TIME)
+    day_end = datetime.combine(date, _DAY_END_TIME)
+    
+    due_today = Task.deadline.between(day_start, day_end)
+    counts = db.session.query(
+        func.sum(case((due_today, 1), else_=0)),
+        func.sum(case(((due_today) & (Task.completed == True), 1), else_=0)),
+        func.sum(case((Task.completion_date.between(day_start, day_end), 1), else_=0)),
+        func.sum(case(((Task.deadline < day_start) & (Task.completed == False), 1), else_=0))
+    ).filter(
+        or_(Task.deadline <= day_end, Task.completion_date.between(day_start, day_end))
+    ).one()
+    
+    return tuple(count or 0 for count in counts)
+
+def _completion_rate(completed_tasks, total_tasks):
+    """Completion percentage rounded to one decimal, 0 when there are no tasks"""
+    if total_tasks > 0:
+        return round((completed_tasks / total_tasks) * 100, 1)
+    return 0
+
+def invalidate_daily_metrics_cache():
+    """
+    Invalidate cached daily metrics
+    
+    Must be called whenever tasks or goals change.
+    """
+    _compute_daily_metrics.cache_clear()
+
+def _to_date(value):
+    """Normalize a DATE() result, which SQLite returns as a string"""
+    if isinstance(value, str):
+        return date_type.fromisoformat(value)
+    return value
+
+def get_time_by_category():
+    """
+    Get the scheduled hours per day for every category
+    
+    Time slots repeat every day, so this is independent of the date.
+    
+    Returns:
+        Dictionary mapping category name to hours
+    """
+    seconds_by_category = {}
+    
+    rows = db.session.query(
+        Category.name, TimeSlot.start_time, TimeSlot.end_time
+    ).outerjoin(TimeSlot, TimeSlot.category_id == Category.id).all()
+    
+    # Sum whole seconds per category and convert to hours once at the end
+    for category_name, start_time, end_time in rows:
+        seconds = seconds_by_category.get(category_name, 0)
+        if start_time is not None and end_time is not None:
+            seconds += TimeSlot.seconds_between(start_time, end_time)
+        seconds_by_category[category_name] = seconds
+    
+    return {
+        category_name: seconds / 3600
+        for category_name, seconds in seconds_by_category.items()
+    }
+
+def get_daily_metrics_range(start_date, end_date):
+    """
+    Get daily metrics for every day in a date range
+    
+    Produces the same dictionaries as calling get_daily_metrics for each
+    day, but with grouped queries over the whole range instead of a set
+    of queries per day.
+    
+    Args:
+        start_date: First date of the range
+        end_date: Last date of the range (inclusive)
+    
+    Returns:
+        List of daily metrics dictionaries ordered by date
+    """
+    range_start = datetime.combine(start_date, _DAY_START_TIME)
+    range_end = datetime.combine(end_date, _DAY_END_TIME)
+    
+    # Tasks due per day, with completed count
+    deadline_day = func.date(Task.deadline)
+    due_rows = db.session.query(
+        deadline_day,
+        func.count(Task.id),
+        func.sum(case((Task.completed == True, 1), else_=0))
+    ).filter(
+        Task.deadline.between(range_start, range_end)
+    ).group_by(deadline_day).all()
+    due_by_day = {_to_date(day): (total, completed or 0) for day, total, completed in due_rows}
+    
+    # Tasks completed per day
+    completion_day = func.date(Task.completion_date)
+    completed_rows = db.session.query(
+        completion_day, func.count(Task.id)
+    ).filter(
+        Task.completion_date.between(range_start, range_end)
+    ).group_by(completion_day).all()
+    completed_by_day = {_to_date(day): count for day, count in completed_rows}
+    
+    # Incomplete tasks: those due before the range are overdue on every day,
+    # those due inside the range become overdue the day after their deadline
+    overdue_before_range = Task.query.filter(
+        Task.deadline < range_start,
+        Task.completed == False
+    ).count()
+    
+    # Goal metrics
+    active_goals = Goal.query.filter_by(completed=False).count()
+    goal_day = func.date(Goal.updated_at)
+    goal_rows = db.session.query(
+        goal_day, func.count(Goal.id)
+    ).filter(
+        Goal.updated_at.between(range_start, range_end),
+        Goal.completed == True
+    ).group_by(goal_day).all()
+    goals_by_day = {_to_date(day): count for day, count in goal_rows}
+    
+    # Time spent is the same for every day
+    time_by_category = get_time_by_category()
+    time_spent = round(sum(time_by_category.values()), 1)
+    
+    metrics_list = []
+    overdue_tasks = overdue_before_range
+    current_date = start_date
+    
+    while current_date <= end_date:
+        total_tasks, completed_tasks = due_by_day.get(current_date, (0, 0))
+        
+        completion_rate = 0
+        if total_tasks > 0:
+            completion_rate = (completed_tasks / total_tasks) * 100
+        
+        metrics_list.append({
+            "date": current_date.isoformat(),
+            "total_tasks": total_tasks,
+            "completed_tasks": completed_tasks,
+            "completed_today": completed_by_day.get(current_date, 0),
+            "completion_rate": round(completion_rate, 1),
+            "active_goals": active_goals,
+            "completed_goals": goals_by_day.get(current_date, 0),
+            "time_spent": time_spent,
+            "time_by_category": dict(time_by_category),
+            "overdue_tasks": overdue_tasks
+        })
+        
+        overdue_tasks += total_tasks - completed_tasks
+        current_date += timedelta(days=1)
+    
+    return metrics_list
+
 def get_weekly_metrics(end_date=None, days=7):
     """
     Get metrics for a week
@@ -145,6 +306,7 @@ def get_weekly_metrics(end_date=None, days=7):
         "completed_tasks": 0,
         "completion_rate": 0,
         "completed_goals": 0,
+        "overdue_tasks": 0,
         "total_time_spent": 0,
         "most_productive_day": None,
         "least_productive_day": None,
@@ -152,27 +314,24 @@ def get_weekly_metrics(end_date=None, days=7):
         "streak": get_current_streak()
     }
     
-    # Get daily metrics for each day
-    current_date = start_date
+    # Get daily metrics for each day with grouped queries over the range
     most_completed = 0
     least_completed = float('inf')
+    time_by_category = defaultdict(float)
     
-    while current_date <= end_date:
-        daily_metrics = get_daily_metrics(current_date)
+    for daily_metrics in get_daily_metrics_range(start_date, end_date):
         weekly_metrics["daily_metrics"].append(daily_metrics)
         
         # Update weekly totals
         weekly_metrics["total_tasks"] += daily_metrics["total_tasks"]
         weekly_metrics["completed_tasks"] += daily_metrics["completed_tasks"]
         weekly_metrics["completed_goals"] += daily_metrics["completed_goals"]
+        weekly_metrics["overdue_tasks"] += daily_metrics["overdue_tasks"]
         weekly_metrics["total_time_spent"] += daily_metrics["time_spent"]
         
         # Update time by category
         for category, time in daily_metrics["time_by_category"].items():
-            if category in weekly_metrics["time_by_category"]:
-                weekly_metrics["time_by_category"][category] += time
-            else:
-                weekly_metrics["time_by_category"][category] = time
+            time_by_category[category] += time
         
         # Check for most/least productive day
         if daily_metrics["completed_tasks"] > most_completed:
@@ -182,8 +341,6 @@ def get_weekly_metrics(end_date=None, days=7):
         if daily_metrics["total_tasks"] > 0 and daily_metrics["completed_tasks"] < least_completed:
             least_completed = daily_metrics["completed_tasks"]
             weekly_metrics["least_productive_day"] = daily_metrics["date"]
-        
-        current_date += timedelta(days=1)
     
     # Calculate weekly completion rate
     if weekly_metrics["total_tasks"] > 0:
@@ -195,84 +352,122 @@ def get_weekly_metrics(end_date=None, days=7):
     weekly_metrics["total_time_spent"] = round(weekly_metrics["total_time_spent"], 1)
     
     # Round time by category
-    for category in weekly_metrics["time_by_category"]:
-        weekly_metrics["time_by_category"][category] = round(
-            weekly_metrics["time_by_category"][category], 1
-        )
+    weekly_metrics["time_by_category"] = {
+        category: round(time, 1) for category, time in time_by_category.items()
+    }
     
     return weekly_metrics
 
+def _get_completion_dates(since):
+    """
+    Get the set of dates on which at least one task was completed
+    
+    Args:
+        since: Earliest date to include
+    
+    Returns:
+        Set of date objects
+    """
+    rows = db.session.query(
+        func.date(Task.completion_date)
+    ).filter(
+        Task.completion_date >= datetime.combine(since, _DAY_START_TIME)
+    ).distinct().all()
+    
+    dates = set()
+    for (value,) in rows:
+        # SQLite returns DATE() results as strings
+        if isinstance(value, str):
+            value = date_type.fromisoformat(value)
+        if value is not None:
+            dates.add(value)
+    
+    return dates
+
 def get_current_streak():
     """
     Calculate the current streak (consecutive days with completed tasks)
     
+    Completion dates are fetched with a single DISTINCT DATE query and the
+    streak is walked in memory. The result is cached for STREAK_CACHE_TTL
+    seconds per UTC day.
+    
     Returns:
         Integer representing streak days
     """
-    streak = 0
+    global _streak_cache
+    
     current_date = datetime.utcnow().date()
+    now_ts = monotonic()
     
-    # Check backwards from yesterday
-    check_date = current_date - timedelta(days=1)
+    if _streak_cache and _streak_cache[0] == current_date and _streak_cache[1] > now_ts:
+        return _streak_cache[2]
     
+    window_days = STREAK_WINDOW_DAYS
     while True:
-        day_start = datetime.combine(check_date, datetime.min.time())
-        day_end = datetime.combine(check_date, datetime.max.time())
-        
-        # Get tasks completed on this day
-        completed_tasks = Task.query.filter(
-            Task.completion_date.between(day_start, day_end)
-        ).count()
+        since = current_date - timedelta(days=window_days)
+        completion_dates = _get_completion_dates(since)
         
-        if completed_tasks > 0:
+        # Check backwards from yesterday
+        streak = 0
+        check_date = current_date - timedelta(days=1)
+        while check_date in completion_dates:
             streak += 1
             check_date -= timedelta(days=1)
-        else:
-            break
+        
+        # Streak may continue past the fetched window, widen it and retry
+        if check_date < since:
+            window_days *= 2
+            continue
+        break
     
     # Add today if there are completed tasks
-    today_start = datetime.combine(current_date, datetime.min.time())
-    today_end = datetime.combine(current_date, datetime.max.time())
-    
-    today_completed = Task.query.filter(
-        Task.completion_date.between(today_start, today_end)
-    ).count()
-    
-    if today_completed > 0:
+    if current_date in completion_dates:
         streak += 1
     
+    _streak_cache = (current_date, now_ts + STREAK_CACHE_TTL, streak)
     return streak
 
+def invalidate_streak_cache():
+    """
+    Invalidate the cached streak
+    
+    Must be called whenever tasks change.
+    """
+    global _streak_cache
+    
+    _streak_cache = None
+
 def get_nudge_for_current_status():
     """
     Generate a smart nudge based on the user's current progress status
     
+    Only the counters needed to pick a nudge are fetched, and yesterday's
+    numbers are looked up only for the checks that compare against them.
+    
     Returns:
         String containing the nudge message
     """
-    # Get today's metrics
-    today = datetime.utcnow().date()
-    today_metrics = get_daily_metrics(today)
-    
-    # Get yesterday's metrics
-    yesterday = today - timedelta(days=1)
-    yesterday_metrics = get_daily_metrics(yesterday)
+    # Get today's task counters
+    now = datetime.utcnow()
+    today = now.date()
+    total_tasks, completed_tasks, completed_today, overdue_tasks = _get_task_counts(today)
     
     # Check for idle pattern (no tasks completed today)
-    if today_metrics["completed_today"] == 0:
+    if completed_today == 0:
         # If we have overdue tasks, nudge about those
-        if today_metrics["overdue_tasks"] > 0:
-            return (f"You have {today_metrics['overdue_tasks']} overdue task{'s' if today_metrics['overdue_tasks'] > 1 else ''}. "
+        if overdue_tasks > 0:
+            return (f"You have {overdue_tasks} overdue task{'s' if overdue_tasks > 1 else ''}. "
                     f"Let's tackle at least one of them today!")
         # Otherwise, encourage starting a task
-        elif today_metrics["total_tasks"] > 0:
+        elif total_tasks > 0:
             return "You haven't completed any tasks today. Can you start with a small one to build momentum?"
         else:
             return "No tasks for today. This might be a good time to plan ahead or work on a bigger goal."
     
     # Check for procrastination pattern (many tasks due soon)
     due_soon = Task.query.filter(
-        Task.deadline < datetime.utcnow() + timedelta(days=2),
+        Task.deadline < now + timedelta(days=2),
         Task.completed == False
     ).count()
     
@@ -280,14 +475,21 @@ def get_nudge_for_current_status():
         return (f"You have {due_soon} tasks due in the next 48 hours. "
                 f"Consider prioritizing the most important ones.")
     
-    # Check for burnout risk (high activity for several days)
-    if today_metrics["completed_today"] > 5 and yesterday_metrics["completed_tasks"] > 5:
-        return "You've been extremely productive lately. Remember to take breaks to avoid burnout."
+    completion_rate = _completion_rate(completed_tasks, total_tasks)
     
-    # Check for strong momentum (increasing completion rate)
-    if (today_metrics["completion_rate"] > 70 and 
-        today_metrics["completion_rate"] > yesterday_metrics["completion_rate"] + 10):
-        return "Great momentum today! You're making excellent progress on your tasks."
+    # Yesterday's counters are only needed for the burnout and momentum checks
+    if completed_today > 5 or completion_rate > 70:
+        yesterday = today - timedelta(days=1)
+        yesterday_total, yesterday_completed, _, _ = _get_task_counts(yesterday)
+        yesterday_rate = _completion_rate(yesterday_completed, yesterday_total)
+        
+        # Check for burnout risk (high activity for several days)
+        if completed_today > 5 and yesterday_completed > 5:
+            return "You've been extremely productive lately. Remember to take breaks to avoid burnout."
+        
+        # Check for strong momentum (increasing completion rate)
+        if completion_rate > 70 and completion_rate > yesterday_rate + 10:
+            return "Great momentum today! You're making excellent progress on your tasks."
     
     # Check for streak milestone
     streak = get_current_streak()
@@ -295,9 +497,9 @@ def get_nudge_for_current_status():
         return f"You're on a {streak}-day streak! Keep it up to build consistency."
     
     # Default encouragement based on completion rate
-    if today_metrics["completion_rate"] < 30:
+    if completion_rate < 30:
         return "You still have several tasks remaining today. Which one feels most doable right now?"
-    elif today_metrics["completion_rate"] < 70:
+    elif completion_rate < 70:
         return "You're making good progress today. What's your next priority?"
     else:
         return "You've completed most of your tasks for today. Great job staying on track!"
@@ -313,65 +515,64 @@ def generate_weekly_report():
     end_date = datetime.utcnow().date()
     weekly_metrics = get_weekly_metrics(end_date)
     
-    # Format dates
-    start_date = datetime.strptime(weekly_metrics["start_date"], "%Y-%m-%d").strftime("%B %d")
-    end_date_str = datetime.strptime(weekly_metrics["end_date"], "%Y-%m-%d").strftime("%B %d, %Y")
+    # Format dates; fromisoformat is much cheaper than strptime
+    start_date = date_type.fromisoformat(weekly_metrics["start_date"]).strftime("%B %d")
+    end_date_str = end_date.strftime("%B %d, %Y")
     
-    # Build the report
-    report = f"# Weekly Progress Report: {start_date} - {end_date_str}\n\n"
+    # Build the report as a list of parts joined once at the end
+    parts = [f"# Weekly Progress Report: {start_date} - {end_date_str}\n\n"]
     
     # Overall stats
-    report += "## Overall Progress\n"
-    report += f"* Completed {weekly_metrics['completed_tasks']} of {weekly_metrics['total_tasks']} tasks "
-    report += f"({weekly_metrics['completion_rate']}% completion rate)\n"
-    report += f"* Achieved {weekly_metrics['completed_goals']} goals\n"
-    report += f"* Current streak: {weekly_metrics['streak']} days\n"
-    report += f"* Total time invested: {weekly_metrics['total_time_spent']} hours\n\n"
+    parts.append("## Overall Progress\n")
+    parts.append(f"* Completed {weekly_metrics['completed_tasks']} of {weekly_metrics['total_tasks']} tasks ")
+    parts.append(f"({weekly_metrics['completion_rate']}% completion rate)\n")
+    parts.append(f"* Achieved {weekly_metrics['completed_goals']} goals\n")
+    parts.append(f"* Current streak: {weekly_metrics['streak']} days\n")
+    parts.append(f"* Total time invested: {weekly_metrics['total_time_spent']} hours\n\n")
     
     # Most productive day
     if weekly_metrics["most_productive_day"]:
-        most_productive = datetime.strptime(weekly_metrics["most_productive_day"], "%Y-%m-%d").strftime("%A")
-        report += f"## Most Productive Day: {most_productive}\n\n"
+        most_productive = date_type.fromisoformat(weekly_metrics["most_productive_day"]).strftime("%A")
+        parts.append(f"## Most Productive Day: {most_productive}\n\n")
     
     # Time distribution
-    report += "## Time Distribution by Category\n"
-    for category, time in sorted(weekly_metrics["time_by_category"].items(), key=lambda x: x[1], reverse=True):
+    parts.append("## Time Distribution by Category\n")
+    time_by_category = weekly_metrics["time_by_category"]
+    for category, time in sorted(time_by_category.items(), key=itemgetter(1), reverse=True):
         if time > 0:
-            report += f"* {category}: {time} hours\n"
-    report += "\n"
+            parts.append(f"* {category}: {time} hours\n")
+    parts.append("\n")
     
     # Areas for improvement
-    report += "## Areas for Improvement\n"
+    parts.append("## Areas for Improvement\n")
     if weekly_metrics["completion_rate"] < 70:
-        report += "* Task completion rate is below target (70%)\n"
+        parts.append("* Task completion rate is below target (70%)\n")
     
     if weekly_metrics["total_tasks"] == 0:
-        report += "* No tasks were scheduled this week\n"
+        parts.append("* No tasks were scheduled this week\n")
     
-    overdue = sum(day["overdue_tasks"] for day in weekly_metrics["daily_metrics"])
+    overdue = weekly_metrics["overdue_tasks"]
     if overdue > 0:
-        report += f"* {overdue} tasks are currently overdue\n"
+        parts.append(f"* {overdue} tasks are currently overdue\n")
     
-    report += "\n"
+    parts.append("\n")
     
     # Recommendations
-    report += "## Recommendations\n"
+    parts.append("## Recommendations\n")
     
     if weekly_metrics["completion_rate"] < 50:
-        report += "* Consider reducing the number of daily tasks to make your goals more achievable\n"
+        parts.append("* Consider reducing the number of daily tasks to make your goals more achievable\n")
     
     if weekly_metrics["streak"] > 0:
-        report += f"* Maintain your {weekly_metrics['streak']}-day streak for consistent progress\n"
+        parts.append(f"* Maintain your {weekly_metrics['streak']}-day streak for consistent progress\n")
     else:
-        report += "* Try to complete at least one task every day to build momentum\n"
+        parts.append("* Try to complete at least one task every day to build momentum\n")
     
-    low_categories = []
-    for category, time in weekly_metrics["time_by_category"].items():
-        if time < 2:  # Less than 2 hours per week
-            low_categories.append(category)
+    # Less than 2 hours per week
+    low_categories = [category for category, time in time_by_category.items() if time < 2]
     
     if low_categories:
         categories_str = ", ".join(low_categories)
-        report += f"* Allocate more time to underserved categories: {categories_str}\n"
+        parts.append(f"* Allocate more time to underserved categories: {categories_str}\n")
     
-    return report
\ No newline at end of file
+    return "".join(parts)
\ No newline at end of file
@@ -44,6 +44,6 @@ def generate_and_save_weekly_report():
     report = generate_weekly_report()
     
     # Save the report as an AI message
-    save_ai_message(report, is_proactive=True)
+    save_ai_message(report, is_proactive=True, kind='weekly_report')
     
     logger.info("Weekly report generated and saved")
\ No newline at end of file
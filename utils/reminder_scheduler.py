@@ -4,6 +4,8 @@ Schedules and triggers reminders for tasks
 """
 import logging
 from datetime import datetime, timedelta
+from sqlalchemy import exists
+from sqlalchemy.orm import aliased, joinedload
 from models import Reminder, Task
 
 logger = logging.getLogger(__name__)
@@ -46,8 +48,10 @@ def check_reminders():
         now = datetime.utcnow()
         five_minutes_ago = now - timedelta(minutes=5)
         
-        # Find pending reminders that should be triggered
-        pending_reminders = Reminder.query.filter(
+        # Find pending reminders that should be triggered, with their tasks
+        pending_reminders = Reminder.query.options(
+            joinedload(Reminder.task)
+        ).filter(
             Reminder.reminder_time <= now,
             Reminder.reminder_time >= five_minutes_ago,
             Reminder.triggered == False
@@ -57,12 +61,13 @@ def check_reminders():
             # Handle the reminder notification
             # In a desktop app, this would trigger a system notification
             logger.info(f"REMINDER: {reminder.message} for task '{reminder.task.title}'")
-            
-            # Mark reminder as triggered
-            reminder.triggered = True
-            db.session.add(reminder)
         
         if pending_reminders:
+            # Mark all reminders as triggered with a single UPDATE
+            reminder_ids = [reminder.id for reminder in pending_reminders]
+            Reminder.query.filter(Reminder.id.in_(reminder_ids)).update(
+                {Reminder.triggered: True}, synchronize_session=False
+            )
             db.session.commit()
             logger.info(f"Triggered {len(pending_reminders)} reminders")
 
@@ -72,43 +77,50 @@ def handle_recurring_tasks():
     This function is called by the scheduler daily at midnight
     """
     from app import db, app
+    from services.progress_service import invalidate_progress_cache
+    from utils.priority_engine import invalidate_priority_cache
     
     # Use application context to avoid "working outside of application context" error
     with app.app_context():
         today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Find completed tasks with recurrence settings
+        # Find completed tasks with recurrence settings whose next instance
+        # has not been created yet
+        next_instance = aliased(Task)
         completed_recurrings = Task.query.filter(
             Task.completed == True,
             Task.recurrence_type.isnot(None),
-            Task.recurrence_value.isnot(None)
+            Task.recurrence_value.isnot(None),
+            Task.completion_date.isnot(None),
+            ~exists().where(
+                next_instance.parent_task_id == Task.id,
+                next_instance.recurrence_type == Task.recurrence_type
+            )
         ).all()
         
-        new_tasks_count = 0
-        
-        for task in completed_recurrings:
-            if should_create_recurrence(task, today):
-                # Create a new task instance
-                new_task = Task(
-                    title=task.title,
-                    description=task.description,
-                    goal_id=task.goal_id,
-                    priority=task.priority,
-                    recurrence_type=task.recurrence_type,
-                    recurrence_value=task.recurrence_value,
-                    parent_task_id=task.id
-                )
-                
+        # Build the new task instances as plain rows for a single bulk insert
+        new_tasks = [
+            {
+                "title": task.title,
+                "description": task.description,
+                "goal_id": task.goal_id,
+                "priority": task.priority,
+                "recurrence_type": task.recurrence_type,
+                "recurrence_value": task.recurrence_value,
+                "parent_task_id": task.id,
                 # Set new deadline based on recurrence type
-                if task.deadline:
-                    new_task.deadline = calculate_next_deadline(task)
-                
-                db.session.add(new_task)
-                new_tasks_count += 1
+                "deadline": calculate_next_deadline(task) if task.deadline else None
+            }
+            for task in completed_recurrings
+            if should_create_recurrence(task, today)
+        ]
         
-        if new_tasks_count > 0:
+        if new_tasks:
+            db.session.bulk_insert_mappings(Task, new_tasks)
             db.session.commit()
-            logger.info(f"Created {new_tasks_count} new recurring tasks")
+            invalidate_progress_cache()
+            invalidate_priority_cache()
+            logger.info(f"Created {len(new_tasks)} new recurring tasks")
 
 def should_create_recurrence(task, today):
     """
@@ -174,24 +186,56 @@ def create_reminder(task_id, reminder_time, message=None):
 def create_default_reminders(task):
     """
     Create default reminders for a task based on its deadline
+    
+    The reminders are added to the session but not committed, so they are
+    saved in the same transaction as the caller's task changes. The task
+    must already have an ID (flush it first if it is new).
+    """
+    return create_default_reminders_bulk([task])
+
+def create_default_reminders_bulk(tasks):
+    """
+    Create default reminders for several tasks at once
+    
+    All reminders are added to the session together, so the next flush
+    writes them as one batched INSERT. Nothing is committed; the tasks must
+    already have IDs.
+    
+    Args:
+        tasks: Tasks to create reminders for, tasks without a deadline are skipped
+    
+    Returns:
+        List of created Reminder objects
     """
-    if not task.deadline:
-        return
-    
-    # Create a reminder for 1 day before deadline
-    one_day_before = task.deadline - timedelta(days=1)
-    if one_day_before > datetime.utcnow():
-        create_reminder(
-            task.id, 
-            one_day_before, 
-            f"Task '{task.title}' is due tomorrow!"
-        )
-    
-    # Create a reminder for 1 hour before deadline
-    one_hour_before = task.deadline - timedelta(hours=1)
-    if one_hour_before > datetime.utcnow():
-        create_reminder(
-            task.id, 
-            one_hour_before, 
-            f"Task '{task.title}' is due in 1 hour!"
-        )
+    from app import db
+    
+    reminders = []
+    now = datetime.utcnow()
+    
+    for task in tasks:
+        if not task.deadline:
+            continue
+        
+        # Create a reminder for 1 day before deadline
+        one_day_before = task.deadline - timedelta(days=1)
+        if one_day_before > now:
+            reminders.append(Reminder(
+                task_id=task.id, 
+                reminder_time=one_day_before, 
+                message=f"Task '{task.title}' is due tomorrow!"
+            ))
+        
+        # Create a reminder for 1 hour before deadline
+        one_hour_before = task.deadline - timedelta(hours=1)
+        if one_hour_before > now:
+            reminders.append(Reminder(
+                task_id=task.id, 
+                reminder_time=one_hour_before, 
+                message=f"Task '{task.title}' is due in 1 hour!"
+            ))
+    
+    if reminders:
+        db.session.add_all(reminders)
+    logger.info(f"Added {len(reminders)} default reminders for {len(tasks)} tasks")
+    
+    return reminders
\ No newline at end of file
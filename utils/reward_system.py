@@ -3,13 +3,21 @@ Reward System for Mentora application
 Implements badges and achievements to gamify the task completion experience
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func, case, extract
 
 from app import db
-from models import Task, Goal, Category
+from models import Task, Goal
+from utils.cache import ttl_cache
+from utils.progress_engine import get_current_streak
 
 logger = logging.getLogger(__name__)
 
+# First and last instants of a day, for building day boundaries
+_DAY_START_TIME = time.min
+_DAY_END_TIME = time.max
+
 # Define badge types
 BADGES = {
     # Streak badges
@@ -107,144 +115,179 @@ BADGES = {
     }
 }
 
-# Cache for user badges
+# Badges grouped by category, in definition order; BADGES is static
+BADGES_BY_CATEGORY = {}
+for _badge in BADGES.values():
+    BADGES_BY_CATEGORY.setdefault(_badge["category"], []).append(_badge)
+del _badge
+
+# Cache for user badges, in the order they were earned
 user_badges = []
 
-def check_for_new_badges():
+# IDs of the earned badges, for constant-time membership checks
+user_badge_ids = set()
+
+# How long badge criteria results are reused (in seconds)
+BADGE_CHECK_TTL = 60
+
+def _most_recent_weekend(today):
     """
-    Check if the user has earned any new badges
+    Get the Saturday and Sunday of the most recent weekend
+    
+    A Sunday counts as part of its own weekend, so on Sunday this returns
+    yesterday and today.
+    
+    Args:
+        today: The date to look back from
     
     Returns:
-        List of newly earned badges
+        Tuple of (saturday, sunday) dates
     """
-    new_badges = []
+    # weekday() is 0 for Monday and 6 for Sunday
+    sunday = today - timedelta(days=(today.weekday() + 1) % 7)
+    return sunday - timedelta(days=1), sunday
+
+def _get_badge_counts():
+    """
+    Get the task counters used by the simple badge checks in one query
+    
+    Covers the completion, perfect day, early bird, night owl and weekend
+    warrior badges with the same windows as the individual check functions.
+    
+    Returns:
+        Dictionary of counters
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    
+    today_start = datetime.combine(today, _DAY_START_TIME)
+    today_end = datetime.combine(today, _DAY_END_TIME)
+    week_start = datetime.combine(today - timedelta(days=6), _DAY_START_TIME)
+    
+    # Most recent weekend, as in is_weekend_warrior
+    saturday, sunday = _most_recent_weekend(today)
+    saturday_start = datetime.combine(saturday, _DAY_START_TIME)
+    saturday_end = datetime.combine(saturday, _DAY_END_TIME)
+    sunday_start = datetime.combine(sunday, _DAY_START_TIME)
+    sunday_end = datetime.combine(sunday, _DAY_END_TIME)
+    
+    completed = Task.completed == True
+    due_today = Task.deadline.between(today_start, today_end)
+    completed_this_week = completed & Task.completion_date.between(week_start, today_end)
+    completion_hour = extract('hour', Task.completion_date)
+    
+    counts = db.session.query(
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((due_today, 1), else_=0)),
+        func.sum(case((due_today & completed, 1), else_=0)),
+        func.sum(case((completed_this_week & (completion_hour < 8), 1), else_=0)),
+        func.sum(case((completed_this_week & (completion_hour >= 22), 1), else_=0)),
+        func.sum(case((completed & Task.completion_date.between(saturday_start, saturday_end), 1), else_=0)),
+        func.sum(case((completed & Task.completion_date.between(sunday_start, sunday_end), 1), else_=0))
+    ).one()
+    
+    (total_completed, due_today_count, completed_due_today,
+     early_completed, late_completed, saturday_completed, sunday_completed) = (count or 0 for count in counts)
+    
+    return {
+        "total_completed": total_completed,
+        "perfect_day": due_today_count > 0 and completed_due_today == due_today_count,
+        "early_bird": early_completed > 0,
+        "night_owl": late_completed > 0,
+        "weekend_warrior": saturday_completed > 0 and sunday_completed > 0
+    }
+
+@ttl_cache(BADGE_CHECK_TTL)
+def _get_qualified_badge_ids():
+    """
+    Get the IDs of all badges whose criteria are currently met
+    
+    Results are cached for BADGE_CHECK_TTL seconds; call
+    invalidate_badge_cache() after changing tasks.
+    
+    Returns:
+        Tuple of badge IDs, in the order they are checked
+    """
+    qualified = []
     
     # Check for streak badges
     streak = get_current_streak()
     
     if streak >= 3:
-        badge = BADGES["streak_3"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("streak_3")
     
     if streak >= 5:
-        badge = BADGES["streak_5"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("streak_5")
     
     if streak >= 7:
-        badge = BADGES["streak_7"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("streak_7")
+    
+    # Counters for the completion, perfect day and special badges in one query
+    counts = _get_badge_counts()
     
     # Check for completion badges
-    total_completed = Task.query.filter_by(completed=True).count()
+    total_completed = counts["total_completed"]
     
     if total_completed >= 10:
-        badge = BADGES["tasks_10"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("tasks_10")
     
     if total_completed >= 50:
-        badge = BADGES["tasks_50"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("tasks_50")
     
     if total_completed >= 100:
-        badge = BADGES["tasks_100"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("tasks_100")
     
     # Check for perfect day badge
-    if has_perfect_day():
-        badge = BADGES["perfect_day"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+    if counts["perfect_day"]:
+        qualified.append("perfect_day")
     
     # Check for perfect week badge
     if has_perfect_week():
-        badge = BADGES["perfect_week"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("perfect_week")
     
     # Check for category master badge
     if has_category_mastery():
-        badge = BADGES["category_master"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+        qualified.append("category_master")
     
     # Check for early bird badge
-    if is_early_bird():
-        badge = BADGES["early_bird"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+    if counts["early_bird"]:
+        qualified.append("early_bird")
     
     # Check for night owl badge
-    if is_night_owl():
-        badge = BADGES["night_owl"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+    if counts["night_owl"]:
+        qualified.append("night_owl")
     
     # Check for weekend warrior badge
-    if is_weekend_warrior():
-        badge = BADGES["weekend_warrior"]
-        if badge not in user_badges:
-            user_badges.append(badge)
-            new_badges.append(badge)
+    if counts["weekend_warrior"]:
+        qualified.append("weekend_warrior")
     
-    return new_badges
+    return tuple(qualified)
 
-def get_current_streak():
+def invalidate_badge_cache():
     """
-    Calculate the current streak (consecutive days with completed tasks)
+    Invalidate the cached badge criteria results
     
-    Returns:
-        Integer representing streak days
+    Must be called whenever tasks change.
     """
-    streak = 0
-    current_date = datetime.utcnow().date()
-    
-    # Check backwards from yesterday
-    check_date = current_date - timedelta(days=1)
-    
-    while True:
-        day_start = datetime.combine(check_date, datetime.min.time())
-        day_end = datetime.combine(check_date, datetime.max.time())
-        
-        # Get tasks completed on this day
-        completed_tasks = Task.query.filter(
-            Task.completion_date.between(day_start, day_end)
-        ).count()
-        
-        if completed_tasks > 0:
-            streak += 1
-            check_date -= timedelta(days=1)
-        else:
-            break
-    
-    # Add today if there are completed tasks
-    today_start = datetime.combine(current_date, datetime.min.time())
-    today_end = datetime.combine(current_date, datetime.max.time())
+    _get_qualified_badge_ids.cache_clear()
+
+def check_for_new_badges():
+    """
+    Check if the user has earned any new badges
     
-    today_completed = Task.query.filter(
-        Task.completion_date.between(today_start, today_end)
-    ).count()
+    Returns:
+        List of newly earned badges
+    """
+    new_badges = []
     
-    if today_completed > 0:
-        streak += 1
+    for badge_id in _get_qualified_badge_ids():
+        if badge_id not in user_badge_ids:
+            badge = BADGES[badge_id]
+            user_badge_ids.add(badge_id)
+            user_badges.append(badge)
+            new_badges.append(badge)
     
-    return streak
+    return new_badges
 
 def has_perfect_day(date=None):
     """
@@ -259,24 +302,18 @@ def has_perfect_day(date=None):
     if date is None:
         date = datetime.utcnow().date()
     
-    day_start = datetime.combine(date, datetime.min.time())
-    day_end = datetime.combine(date, datetime.max.time())
+    day_start = datetime.combine(date, _DAY_START_TIME)
+    day_end = datetime.combine(date, _DAY_END_TIME)
     
-    # Get all tasks due on this day
-    total_tasks = Task.query.filter(
+    # Count tasks due on this day and how many were completed in one query
+    total_tasks, completed_tasks = db.session.query(
+        func.count(Task.id),
+        func.sum(case((Task.completed == True, 1), else_=0))
+    ).filter(
         Task.deadline.between(day_start, day_end)
-    ).count()
+    ).one()
     
     # If no tasks, it's not a perfect day
-    if total_tasks == 0:
-        return False
-    
-    # Get completed tasks
-    completed_tasks = Task.query.filter(
-        Task.deadline.between(day_start, day_end),
-        Task.completed == True
-    ).count()
-    
     return total_tasks > 0 and completed_tasks == total_tasks
 
 def has_perfect_week():
@@ -290,14 +327,23 @@ def has_perfect_week():
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=6)
     
-    # Check each day
-    current_date = start_date
-    while current_date <= end_date:
-        if not has_perfect_day(current_date):
-            return False
-        current_date += timedelta(days=1)
+    start_datetime = datetime.combine(start_date, _DAY_START_TIME)
+    end_datetime = datetime.combine(end_date, _DAY_END_TIME)
+    
+    # Count tasks due and completed per day in one grouped query
+    daily_counts = db.session.query(
+        func.count(Task.id),
+        func.sum(case((Task.completed == True, 1), else_=0))
+    ).filter(
+        Task.deadline.between(start_datetime, end_datetime)
+    ).group_by(
+        func.date(Task.deadline)
+    ).all()
+    
+    # Every day needs tasks, all of them completed (days without tasks have no row)
+    perfect_days = sum(1 for total, completed in daily_counts if completed == total)
     
-    return True
+    return perfect_days == 7
 
 def has_category_mastery():
     """
@@ -306,42 +352,29 @@ def has_category_mastery():
     Returns:
         Boolean indicating if there's a mastered category
     """
-    # Get all categories
-    categories = Category.query.all()
-    
     # Get the start of the week (past 7 days)
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=6)
     
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    
-    for category in categories:
-        # Get all goals in this category
-        goals = Goal.query.filter_by(category_id=category.id).all()
-        
-        if not goals:
-            continue
-        
-        # Get all tasks for these goals
-        total_tasks = 0
-        completed_tasks = 0
-        
-        for goal in goals:
-            # Get tasks due during this week
-            tasks = Task.query.filter(
-                Task.goal_id == goal.id,
-                Task.deadline.between(start_datetime, end_datetime)
-            ).all()
-            
-            total_tasks += len(tasks)
-            completed_tasks += sum(1 for task in tasks if task.completed)
-        
-        # Check if there are tasks and all are completed
-        if total_tasks >= 5 and completed_tasks == total_tasks:
-            return True
-    
-    return False
+    start_datetime = datetime.combine(start_date, _DAY_START_TIME)
+    end_datetime = datetime.combine(end_date, _DAY_END_TIME)
+    
+    # Count tasks due this week per category without loading the tasks
+    total_tasks = func.count(Task.id)
+    completed_tasks = func.sum(case((Task.completed == True, 1), else_=0))
+    
+    mastered = db.session.query(Goal.category_id).join(
+        Task, Task.goal_id == Goal.id
+    ).filter(
+        Task.deadline.between(start_datetime, end_datetime)
+    ).group_by(
+        Goal.category_id
+    ).having(
+        total_tasks >= 5,
+        completed_tasks == total_tasks
+    ).first()
+    
+    return mastered is not None
 
 def is_early_bird():
     """
@@ -354,20 +387,17 @@ def is_early_bird():
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=6)
     
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
+    start_datetime = datetime.combine(start_date, _DAY_START_TIME)
+    end_datetime = datetime.combine(end_date, _DAY_END_TIME)
     
     # Find any task completed before 8:00 AM
-    completed_tasks = Task.query.filter(
+    early_task = db.session.query(Task.id).filter(
         Task.completion_date.between(start_datetime, end_datetime),
-        Task.completed == True
-    ).all()
-    
-    for task in completed_tasks:
-        if task.completion_date.hour < 8:
-            return True
+        Task.completed == True,
+        extract('hour', Task.completion_date) < 8
+    ).first()
     
-    return False
+    return early_task is not None
 
 def is_night_owl():
     """
@@ -380,20 +410,17 @@ def is_night_owl():
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=6)
     
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
+    start_datetime = datetime.combine(start_date, _DAY_START_TIME)
+    end_datetime = datetime.combine(end_date, _DAY_END_TIME)
     
     # Find any task completed after 10:00 PM
-    completed_tasks = Task.query.filter(
+    late_task = db.session.query(Task.id).filter(
         Task.completion_date.between(start_datetime, end_datetime),
-        Task.completed == True
-    ).all()
-    
-    for task in completed_tasks:
-        if task.completion_date.hour >= 22:
-            return True
+        Task.completed == True,
+        extract('hour', Task.completion_date) >= 22
+    ).first()
     
-    return False
+    return late_task is not None
 
 def is_weekend_warrior():
     """
@@ -403,31 +430,23 @@ def is_weekend_warrior():
         Boolean indicating if the user is a weekend warrior
     """
     # Get the most recent weekend
-    today = datetime.utcnow().date()
-    days_since_sunday = today.weekday() + 1 if today.weekday() != 6 else 0
-    
-    sunday = today - timedelta(days=days_since_sunday)
-    saturday = sunday - timedelta(days=1)
-    
-    # Check Saturday
-    saturday_start = datetime.combine(saturday, datetime.min.time())
-    saturday_end = datetime.combine(saturday, datetime.max.time())
-    
-    saturday_completed = Task.query.filter(
-        Task.completion_date.between(saturday_start, saturday_end),
-        Task.completed == True
-    ).count()
-    
-    # Check Sunday
-    sunday_start = datetime.combine(sunday, datetime.min.time())
-    sunday_end = datetime.combine(sunday, datetime.max.time())
-    
-    sunday_completed = Task.query.filter(
-        Task.completion_date.between(sunday_start, sunday_end),
+    saturday, sunday = _most_recent_weekend(datetime.utcnow().date())
+    
+    # Count tasks completed on Saturday and on Sunday in one query
+    saturday_start = datetime.combine(saturday, _DAY_START_TIME)
+    saturday_end = datetime.combine(saturday, _DAY_END_TIME)
+    sunday_start = datetime.combine(sunday, _DAY_START_TIME)
+    sunday_end = datetime.combine(sunday, _DAY_END_TIME)
+    
+    saturday_completed, sunday_completed = db.session.query(
+        func.sum(case((Task.completion_date.between(saturday_start, saturday_end), 1), else_=0)),
+        func.sum(case((Task.completion_date.between(sunday_start, sunday_end), 1), else_=0))
+    ).filter(
+        Task.completion_date.between(saturday_start, sunday_end),
         Task.completed == True
-    ).count()
+    ).one()
     
-    return saturday_completed > 0 and sunday_completed > 0
+    return bool(saturday_completed) and bool(sunday_completed)
 
 def get_all_badges():
     """
@@ -439,22 +458,14 @@ def get_all_badges():
     # Make sure we have the latest badges
     check_for_new_badges()
     
-    # Organize badges by category
-    result = {}
-    
-    for badge_id, badge in BADGES.items():
-        category = badge["category"]
-        
-        if category not in result:
-            result[category] = []
-        
-        # Add earned status
-        badge_copy = badge.copy()
-        badge_copy["earned"] = "true" if badge in user_badges else "false"
-        
-        result[category].append(badge_copy)
-    
-    return result
+    # Add earned status to the pre-grouped badges
+    return {
+        category: [
+            {**badge, "earned": "true" if badge["id"] in user_badge_ids else "false"}
+            for badge in badges
+        ]
+        for category, badges in BADGES_BY_CATEGORY.items()
+    }
 
 def get_earned_badges():
     """